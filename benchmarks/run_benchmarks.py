@@ -0,0 +1,323 @@
+"""Benchmarks for the calculation, load, render and export paths.
+
+Synthetic inflation tables from 30 to 10,000 years and cohorts from 1 to
+10^6 pensions are generated with a fixed seed. Each benchmark reports the
+best time per call over several repeats. Results can be saved as a
+baseline JSON file and later runs compared against it; a benchmark slower
+than the baseline by more than the threshold is flagged as a regression
+and the script exits with status 1, as it does when an entry point
+imports slower than its budget in IMPORT_BUDGETS_MS.
+
+Usage:
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --threshold 0.25
+    python benchmarks/run_benchmarks.py --quick --filter engine
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import compensation_engine  # noqa: E402
+import exporters  # noqa: E402
+import inflation_data  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+YEAR_SIZES = [30, 300, 3000, 10000]
+COHORT_SIZES = [1, 100, 10_000, 1_000_000]
+QUICK_YEAR_SIZES = [30, 300]
+QUICK_COHORT_SIZES = [1, 10_000]
+PENSION = 25000.0
+# Import time budgets of the entry points (cached data, warm disk cache)
+IMPORT_BUDGETS_MS = {'cli': 400, 'main_window': 400}
+
+
+def synthetic_table(n_years, seed=0):
+    """Inflation table of n_years ending in 2025 with plausible rates"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'year': np.arange(2026 - n_years, 2026),
+        'inflation_rosstat': rng.uniform(2.0, 12.0, n_years).round(2),
+        'indexation': rng.uniform(2.0, 12.0, n_years).round(2)
+    })
+
+
+def measure(fn, min_time=0.2, max_repeat=20):
+    """Best time of one call of fn in seconds"""
+    best = float('inf')
+    spent = 0.0
+    repeat = 0
+    while repeat < max_repeat and (repeat < 3 or spent < min_time):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        repeat += 1
+        # Slow benchmarks are measured once
+        if elapsed > 2.0:
+            break
+    return best
+
+
+class Suite:
+    """Collects benchmark results"""
+
+    def __init__(self, name_filter=None):
+        self.name_filter = name_filter
+        self.results = {}
+
+    def wanted(self, name):
+        return not self.name_filter or self.name_filter in name
+
+    def run(self, name, fn, setup=None):
+        if not self.wanted(name):
+            return
+        if setup is not None:
+            setup()
+        seconds = measure(fn)
+        self.results[name] = seconds
+        print(f"{name:<45} {seconds * 1000:12.3f} ms", flush=True)
+
+
+def engine_benchmarks(suite, year_sizes, cohort_sizes):
+    for n_years in year_sizes:
+        df = synthetic_table(n_years)
+        index = compensation_engine.YearIndex.from_dataframe(df)
+        start = int(df['year'].iloc[0])
+        suite.run(f"engine.year_index[{n_years}y]",
+                  lambda: compensation_engine.YearIndex.from_dataframe(df))
+        suite.run(f"engine.calculate_compensation[{n_years}y]",
+                  lambda: compensation_engine.calculate_compensation(index, PENSION, start, 2025))
+        suite.run(f"engine.methodology_data[{n_years}y]",
+                  lambda: compensation_engine.UnitResult(index, start, 2025).methodology_data(PENSION))
+
+    index = compensation_engine.YearIndex.from_dataframe(synthetic_table(30))
+    rng = np.random.default_rng(1)
+    for n_pensions in cohort_sizes:
+        pensions = rng.uniform(10000, 60000, n_pensions)
+        starts = rng.integers(1996, 2025, n_pensions)
+        suite.run(f"engine.batch[{n_pensions}p]",
+                  lambda: compensation_engine.calculate_compensation_batch(index, pensions, starts))
+
+
+def load_benchmarks(suite, year_sizes, work_dir):
+    for n_years in year_sizes:
+        path = os.path.join(work_dir, f'inflation_{n_years}.xlsx')
+        synthetic_table(n_years).to_excel(path, index=False)
+        sidecar = inflation_data.sidecar_path(path)
+
+        def remove_sidecar():
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+
+        suite.run(f"load.excel[{n_years}y]",
+                  lambda: inflation_data.load_inflation_table(path, use_cache=False))
+        suite.run(f"load.sidecar[{n_years}y]",
+                  lambda: inflation_data.load_inflation_table(path),
+                  setup=lambda: (remove_sidecar(), inflation_data.load_inflation_table(path)))
+
+
+def gui_benchmarks(suite, year_sizes, work_dir):
+    """Benchmarks of PensionLagAnalyzer methods on an offscreen window"""
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
+    app = QApplication.instance() or QApplication([])
+    # Dialogs would block an unattended run
+    for name in ('critical', 'warning', 'information'):
+        setattr(QMessageBox, name, staticmethod(lambda *args: None))
+
+    import main_window
+
+    for n_years in year_sizes:
+        df = synthetic_table(n_years)
+        start = int(df['year'].iloc[0])
+        path = os.path.join(work_dir, f'gui_inflation_{n_years}.xlsx')
+        df.to_excel(path, index=False)
+
+        main_window.inflation_data.default_data_path = lambda: path
+        with contextlib.redirect_stdout(io.StringIO()):
+            window = main_window.PensionLagAnalyzer()
+        app.processEvents()
+
+        def load_data():
+            # load_data reports the source on stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                window.load_data()
+
+        suite.run(f"gui.load_data[{n_years}y]", load_data)
+        suite.run(f"gui.calculate_compensation[{n_years}y]",
+                  lambda: window.calculate_compensation(PENSION, start, 2025))
+
+        result = window.calculate_compensation(PENSION, start, 2025)
+        params = {'pension_2025': PENSION, 'start_year': start, 'end_year': 2025}
+        suite.run(f"gui.get_methodology_data[{n_years}y]", lambda: window.get_methodology_data(result))
+        window.results, window.calc_params = result, params
+
+        def update_methodology_new():
+            window.methodology_html.clear()
+            window.methodology_shown = None
+            window.update_methodology()
+
+        suite.run(f"gui.update_methodology.first[{n_years}y]", update_methodology_new)
+        suite.run(f"gui.update_methodology.cached[{n_years}y]", window.update_methodology)
+        suite.run(f"gui.update_table[{n_years}y]", lambda: window.update_table(result))
+
+        def plot_new():
+            window.ensure_chart().clear()
+            window.plot_chart(result)
+            window.canvas.draw()
+
+        # Live update to another pension amount: the chart blits the data
+        # unless it needs new limits, and a pending full redraw runs here
+        rescaled = [window.calculate_compensation(PENSION * 0.99, start, 2025), result]
+
+        def plot_update():
+            rescaled.reverse()
+            window.plot_chart(rescaled[0])
+            app.processEvents()
+
+        suite.run(f"gui.plot_chart.first[{n_years}y]", plot_new)
+        suite.run(f"gui.plot_chart.update[{n_years}y]", plot_update, setup=plot_update)
+
+        export_path = os.path.join(work_dir, f'export_{n_years}.xlsx')
+        suite.run(f"gui.export_to_excel[{n_years}y]",
+                  lambda: exporters.write_excel_report(export_path, result, params, window.df))
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+
+
+def import_benchmarks(suite):
+    """Import time of the entry points in a fresh interpreter
+
+    Returns names of imports slower than their budget.
+    """
+    overruns = []
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        name = f"import.{module}"
+        if not suite.wanted(name):
+            continue
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+        def run():
+            output = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR,
+                                    capture_output=True, text=True, check=True).stdout
+            return float(output.split()[-1])
+
+        run()  # Warm the disk cache
+        seconds = min(run() for _ in range(3))
+        suite.results[name] = seconds
+        flag = ''
+        if seconds * 1000 > budget_ms:
+            overruns.append(name)
+            flag = f"  OVER BUDGET ({budget_ms} ms)"
+        print(f"{name:<45} {seconds * 1000:12.3f} ms{flag}", flush=True)
+    return overruns
+
+
+def environment():
+    """Versions that affect the timings"""
+    import matplotlib
+    import openpyxl
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'openpyxl': openpyxl.__version__,
+        'matplotlib': matplotlib.__version__
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print comparison with baseline and return names of regressions"""
+    regressions = []
+    print()
+    print(f"{'Benchmark':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = seconds / base - 1.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<45} {base * 1000:10.3f}ms {seconds * 1000:10.3f}ms {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run benchmarks and compare with baseline")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store results as the new baseline")
+    parser.add_argument('--output', help="Also write results JSON to this file")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Relative slowdown reported as regression (default 0.25)")
+    parser.add_argument('--filter', help="Run only benchmarks whose name contains this text")
+    parser.add_argument('--quick', action='store_true', help="Small sizes only")
+    parser.add_argument('--no-gui', action='store_true', help="Skip GUI benchmarks")
+    args = parser.parse_args(argv)
+
+    year_sizes = QUICK_YEAR_SIZES if args.quick else YEAR_SIZES
+    cohort_sizes = QUICK_COHORT_SIZES if args.quick else COHORT_SIZES
+    suite = Suite(args.filter)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        engine_benchmarks(suite, year_sizes, cohort_sizes)
+        load_benchmarks(suite, year_sizes, work_dir)
+        if not args.no_gui:
+            gui_benchmarks(suite, year_sizes, work_dir)
+        overruns = import_benchmarks(suite)
+
+    report = {'environment': environment(), 'results': suite.results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if overruns:
+        print(f"\n{len(overruns)} import(s) over budget: {', '.join(overruns)}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved: {args.baseline}")
+        return 1 if overruns else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 1 if overruns else 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(suite.results, baseline['results'], args.threshold)
+    if baseline.get('environment') != report['environment']:
+        print("\nNote: environment differs from baseline:")
+        for key, value in report['environment'].items():
+            if baseline.get('environment', {}).get(key) != value:
+                print(f"  {key}: {baseline.get('environment', {}).get(key)} -> {value}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 1 if overruns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
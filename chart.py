@@ -0,0 +1,400 @@
+"""Charts of pension dynamics, inflation lag losses and parameter sweeps."""
+import math
+
+import numpy as np
+
+# Maximum number of year labels on the x axis
+MAX_YEAR_TICKS = 30
+
+# Space above and below the data, as a fraction of its range
+Y_MARGIN = 0.1
+# Y limits are kept while the data spans at least this fraction of them
+Y_LIMITS_MIN_FILL = 0.5
+
+# Line colors of comparison datasets
+COMPARISON_COLORS = ['#d2691e', '#4682b4', '#8b008b', '#2e8b57', '#b8860b', '#708090']
+
+
+def _format_amount(value):
+    return f'{value:,.0f}'.replace(',', ' ')
+
+
+class TooltipChart:
+    """Axes on a canvas with a hover tooltip, redrawn by blitting
+
+    Data artists of a subclass (_data_artists) are animated: a full redraw
+    saves the figure without them as the static background and then draws
+    them on top. An update that keeps axes, ticks and legend only restores
+    the static background and redraws the data (_refresh). The background
+    with the data is saved too, so moving the tooltip only restores it and
+    draws the tooltip. Subclasses create the tooltip with _add_tooltip and
+    show values in _on_hover.
+    """
+
+    def __init__(self, figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+        self.ax = None
+        self.tooltip = None
+        self._static_background = None
+        self._background = None
+        self._draw_pending = False
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('motion_notify_event', self._on_hover)
+
+    def clear(self):
+        """Remove all data from chart"""
+        self.figure.clear()
+        self.ax = self.figure.add_subplot(111)
+        self.tooltip = None
+        self._static_background = None
+        self._background = None
+
+    def _data_artists(self):
+        """Animated artists drawn over the static background, in drawing order"""
+        return []
+
+    def _add_tooltip(self):
+        self.tooltip = self.ax.annotate(
+            '', xy=(0, 0), xytext=(12, 12), textcoords='offset points',
+            fontsize=8, animated=True, visible=False,
+            bbox=dict(boxstyle='round', fc='white', ec='#243e4a', alpha=0.9)
+        )
+
+    def _refresh(self, full):
+        """Redraw the figure, or only the data artists if nothing else changed"""
+        if full or self._draw_pending or self._static_background is None:
+            self._draw_pending = True
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._static_background)
+        self._draw_layers()
+        self.canvas.blit(self.figure.bbox)
+
+    def _draw_layers(self):
+        """Draw data artists and tooltip over the static background"""
+        for artist in self._data_artists():
+            self.ax.draw_artist(artist)
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        if self.tooltip is not None and self.tooltip.get_visible():
+            self.ax.draw_artist(self.tooltip)
+
+    def _on_draw(self, event):
+        """Save backgrounds after a full redraw
+
+        Runs inside the redraw, which paints the canvas afterwards, so the
+        layers are drawn without blitting.
+        """
+        if self.canvas.is_saving():
+            return
+        self._draw_pending = False
+        self._static_background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_layers()
+
+    def _blit_tooltip(self):
+        if self._background is None or self.tooltip is None:
+            return
+        self.canvas.restore_region(self._background)
+        if self.tooltip.get_visible():
+            self.ax.draw_artist(self.tooltip)
+        self.canvas.blit(self.figure.bbox)
+
+    def _set_tooltip_visible(self, visible):
+        """Show or hide the tooltip, redrawing only when something changes"""
+        if visible or self.tooltip.get_visible():
+            self.tooltip.set_visible(visible)
+            self._blit_tooltip()
+
+    def _on_hover(self, event):
+        """Show values under the cursor, implemented by subclasses"""
+
+
+class CompensationChart(TooltipChart):
+    """Bars of pensions and yearly losses with a line of accumulated losses
+
+    Artists are created once and updated in place when a new result has the
+    same number of years. The y limits are kept while the data fits them
+    well, so such an update only blits the data over the static background;
+    new limits, year labels or comparison lines need a full redraw. Values
+    are shown in a hover tooltip instead of a text artist per data point.
+    Accumulated losses of comparison datasets are drawn as dashed lines.
+    """
+
+    def __init__(self, figure, canvas):
+        super().__init__(figure, canvas)
+        self.bars_pension = []
+        self.bars_compensation = []
+        self.line_cumulative = None
+        self.comparison_lines = []
+        self._years = []
+        self._values = None
+        self._comparison = []
+
+    def clear(self):
+        """Remove all data from chart"""
+        super().clear()
+        self.bars_pension = []
+        self.bars_compensation = []
+        self.line_cumulative = None
+        self.comparison_lines = []
+        self._years = []
+        self._values = None
+        self._comparison = []
+
+    def update(self, years, pensions, compensations, cumulative_compensations, comparison=()):
+        """Show new data, reusing artists when the number of years is unchanged
+
+        comparison is a list of (dataset name, accumulated losses) with
+        values aligned with years; NaN marks years missing from a dataset.
+        """
+        years = list(years)
+        pensions = np.asarray(pensions, dtype=float)
+        compensations = np.asarray(compensations, dtype=float)
+        cumulative_compensations = np.asarray(cumulative_compensations, dtype=float)
+
+        built = self.line_cumulative is None or len(years) != len(self._years)
+        full = built
+        if built:
+            self._build(years, pensions, compensations, cumulative_compensations)
+        else:
+            for bar, height in zip(self.bars_pension, pensions.tolist()):
+                bar.set_height(height)
+            for bar, height in zip(self.bars_compensation, compensations.tolist()):
+                bar.set_height(height)
+            self.line_cumulative.set_ydata(cumulative_compensations)
+            if years != self._years:
+                self._set_year_ticks(years)
+                full = True
+
+        if self._set_comparison(comparison):
+            full = True
+        series = [pensions, compensations, cumulative_compensations] + [values for _, values in self._comparison]
+        if self._set_y_limits(series, force=built):
+            full = True
+        if built:
+            self.figure.tight_layout()
+
+        self._years = years
+        self._values = (pensions, compensations, cumulative_compensations)
+        self.tooltip.set_visible(False)
+        self._refresh(full)
+
+    def _build(self, years, pensions, compensations, cumulative_compensations):
+        """Create axes and artists for given number of years"""
+        self.clear()
+        ax = self.ax
+
+        x_pos = np.arange(len(years))
+        bar_width = 0.35
+
+        # Bars: pensions and compensations (losses)
+        self.bars_pension = ax.bar(x_pos - bar_width / 2, pensions, bar_width,
+                                   color='#243e4a', alpha=0.7, label='Pension amount')
+
+        self.bars_compensation = ax.bar(x_pos + bar_width / 2, compensations, bar_width,
+                                        color='#800000', alpha=0.7, label='Losses per year (compensation)')
+
+        # Accumulated losses line
+        self.line_cumulative = ax.plot(x_pos, cumulative_compensations, 'o-',
+                                       color='#556b2f', linewidth=2, markersize=6,
+                                       label='Accumulated losses')[0]
+        for artist in [*self.bars_pension, *self.bars_compensation, self.line_cumulative]:
+            artist.set_animated(True)
+
+        ax.set_title('Pension Dynamics and Inflation Lag Losses', fontsize=12, fontweight='bold')
+        ax.set_xlabel('Year', fontsize=10)
+        ax.set_ylabel('Amount, RUB', fontsize=10)
+
+        self._set_year_ticks(years)
+        ax.tick_params(axis='y', labelsize=9)
+
+        self._add_legend()
+        ax.grid(True, alpha=0.3, axis='y')
+
+        # Values of the year under the cursor (drawn with blitting)
+        self._add_tooltip()
+
+    def _data_artists(self):
+        if self.line_cumulative is None:
+            return []
+        # Legend last: drawn over bars and lines like in a full redraw
+        return [*self.bars_pension, *self.bars_compensation, self.line_cumulative, *self.comparison_lines,
+                self.ax.get_legend()]
+
+    def _add_legend(self):
+        self.ax.legend(fontsize=9, loc='upper left').set_animated(True)
+
+    def _set_comparison(self, comparison):
+        """Replace the lines of comparison datasets; returns whether anything changed"""
+        if not comparison and not self.comparison_lines:
+            return False
+        for line in self.comparison_lines:
+            line.remove()
+        x_pos = np.arange(len(self.line_cumulative.get_xdata()))
+        self.comparison_lines = [
+            self.ax.plot(x_pos, values, 's--', color=COMPARISON_COLORS[i % len(COMPARISON_COLORS)],
+                         linewidth=1.5, markersize=4, label=f'Accumulated losses: {name}', animated=True)[0]
+            for i, (name, values) in enumerate(comparison)
+        ]
+        self._comparison = [(name, np.asarray(values, dtype=float)) for name, values in comparison]
+        self._add_legend()
+        return True
+
+    def _set_y_limits(self, series, force=False):
+        """Fit the y axis to the data with margins; returns whether the limits changed
+
+        Unless forced, limits are kept while the data fits them and spans at
+        least Y_LIMITS_MIN_FILL of them, so a small change such as another
+        pension amount does not need a full redraw.
+        """
+        values = np.concatenate([np.ravel(values) for values in series])
+        values = values[np.isfinite(values)]
+        low = min(0.0, float(values.min())) if values.size else 0.0
+        high = max(0.0, float(values.max())) if values.size else 0.0
+        bottom, top = self.ax.get_ylim()
+        if not force and bottom <= low and high <= top and high - low >= (top - bottom) * Y_LIMITS_MIN_FILL:
+            return False
+        if high == low:
+            self.ax.set_ylim(low, low + 1.0)
+        else:
+            # Bars start at zero, so only a negative minimum gets a margin below
+            margin = Y_MARGIN * (high - low)
+            self.ax.set_ylim(low - margin if low < 0 else 0.0, high + margin if high > 0 else 0.0)
+        return True
+
+    def _set_year_ticks(self, years):
+        """Label x axis with years, thinning labels for long series"""
+        step = max(1, math.ceil(len(years) / MAX_YEAR_TICKS))
+        ticks = np.arange(0, len(years), step)
+        self.ax.set_xticks(ticks)
+        self.ax.set_xticklabels([str(years[i]) for i in ticks], fontsize=9)
+
+    def _on_hover(self, event):
+        """Show values of the year under the cursor"""
+        if self.tooltip is None or self._values is None:
+            return
+
+        visible = False
+        if event.inaxes is self.ax and event.xdata is not None:
+            i = int(round(event.xdata))
+            if 0 <= i < len(self._years):
+                pension, compensation, cumulative = (values[i] for values in self._values)
+                others = [(name, values[i]) for name, values in self._comparison if np.isfinite(values[i])]
+                self.tooltip.xy = (i, max([pension, compensation, cumulative] + [value for _, value in others]))
+                self.tooltip.set_text(
+                    f"{self._years[i]}\n"
+                    f"Pension amount: {_format_amount(pension)}\n"
+                    f"Losses per year: {_format_amount(compensation)}\n"
+                    f"Accumulated losses: {_format_amount(cumulative)}"
+                    + ''.join(f"\nAccumulated losses, {name}: {_format_amount(value)}" for name, value in others)
+                )
+                visible = True
+
+        self._set_tooltip_visible(visible)
+
+
+class SweepHeatmap(TooltipChart):
+    """Heatmap of one metric over a grid of two sweep parameters
+
+    Rows and columns are labelled with parameter values; cells without a
+    value (NaN) are left blank. The image is updated in place when the grid
+    shape is unchanged, but the figure is redrawn fully: the color scale,
+    color bar and titles follow the values. The value under the cursor is
+    shown in a blitted tooltip.
+    """
+
+    def __init__(self, figure, canvas):
+        super().__init__(figure, canvas)
+        self.image = None
+        self.colorbar = None
+        self._values = None
+        self._rows = []
+        self._columns = []
+        self._titles = ('', '')
+        self._format = _format_amount
+
+    def clear(self):
+        """Remove all data from chart"""
+        super().clear()
+        self.image = None
+        self.colorbar = None
+        self._values = None
+
+    def update(self, values, rows, columns, row_title, column_title, title, value_format=_format_amount):
+        """Show a (rows × columns) grid of values
+
+        value_format converts a value to the text of the tooltip and the
+        color bar label.
+        """
+        values = np.asarray(values, dtype=float)
+        rows = list(rows)
+        columns = list(columns)
+        finite = values[np.isfinite(values)]
+        low, high = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+
+        if self.image is None or values.shape != self._values.shape:
+            self._build(values)
+        else:
+            self.image.set_data(values)
+        self.image.set_clim(low, high if high > low else low + 1.0)
+
+        self._set_ticks(rows, columns)
+        self.ax.set_xlabel(column_title, fontsize=10)
+        self.ax.set_ylabel(row_title, fontsize=10)
+        self.ax.set_title(title, fontsize=12, fontweight='bold')
+        self.colorbar.set_label(title, fontsize=9)
+        self.figure.tight_layout()
+
+        self._values = values
+        self._rows = rows
+        self._columns = columns
+        self._titles = (row_title, column_title)
+        self._format = value_format
+        self.tooltip.set_visible(False)
+        # Color scale and titles change with nearly every update: always redraw fully
+        self._refresh(full=True)
+
+    def _build(self, values):
+        """Create axes, image and color bar for the grid shape"""
+        from matplotlib import colormaps
+
+        self.clear()
+        cmap = colormaps['YlOrRd'].copy()
+        cmap.set_bad('#f0f0f0')
+        self.image = self.ax.imshow(values, cmap=cmap, aspect='auto', origin='lower',
+                                    interpolation='nearest')
+        self.colorbar = self.figure.colorbar(self.image, ax=self.ax)
+        self.colorbar.ax.tick_params(labelsize=8)
+        self._add_tooltip()
+
+    def _set_ticks(self, rows, columns):
+        """Label both axes, thinning labels of long axes"""
+        for set_ticks, set_labels, labels in ((self.ax.set_yticks, self.ax.set_yticklabels, rows),
+                                               (self.ax.set_xticks, self.ax.set_xticklabels, columns)):
+            step = max(1, math.ceil(len(labels) / MAX_YEAR_TICKS))
+            ticks = np.arange(0, len(labels), step)
+            set_ticks(ticks)
+            set_labels([str(labels[i]) for i in ticks], fontsize=9)
+        self.ax.tick_params(axis='x', labelrotation=45)
+
+    def _on_hover(self, event):
+        """Show parameters and value of the cell under the cursor"""
+        if self.tooltip is None or self._values is None:
+            return
+
+        visible = False
+        if event.inaxes is self.ax and event.xdata is not None:
+            row = int(round(event.ydata))
+            column = int(round(event.xdata))
+            rows, columns = self._values.shape
+            if 0 <= row < rows and 0 <= column < columns and np.isfinite(self._values[row, column]):
+                self.tooltip.xy = (column, row)
+                self.tooltip.set_text(
+                    f"{self._titles[0]}: {self._rows[row]}\n"
+                    f"{self._titles[1]}: {self._columns[column]}\n"
+                    f"{self._format(self._values[row, column])}"
+                )
+                visible = True
+
+        self._set_tooltip_visible(visible)
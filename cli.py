@@ -0,0 +1,127 @@
+"""Command-line calculation of inflation lag compensation.
+
+Never imports Qt or matplotlib; pandas is only imported when the data file
+has to be parsed because its binary cache is missing or stale.
+
+Usage:
+    python cli.py --pension 25000 --start 2020 --format json
+    python cli.py --pension 25000 --start 2020 --output summary.parquet --details details.parquet
+    python cli.py --pension 25000 --start 2020 --store                 # reuse stored data and results
+    python cli.py --pension 25000 --start 2020 --store --data-version 2
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+
+import compensation_engine
+import exporters
+import inflation_data
+
+SUMMARY_COLUMNS = [
+    'year',
+    'pension_in_january',
+    'inflation_year',
+    'indexation_year',
+    'sum_per_year',
+    'compensation_per_month',
+    'compensation_per_year',
+    'loss_percentage',
+    'total_compensation'
+]
+
+
+def summary_rows(result):
+    """Yearly summary as a list of dicts with plain Python values"""
+    columns = result['summary_columns']
+    values = [columns[key].tolist() for key in SUMMARY_COLUMNS]
+    return [dict(zip(SUMMARY_COLUMNS, row)) for row in zip(*values)]
+
+
+def format_json(result, params):
+    report = dict(params)
+    report.update({
+        'total_paid': result['total_paid'],
+        'total_compensation': result['total_compensation'],
+        'loss_percentage': result['loss_percentage'],
+        'yearly_summary': summary_rows(result)
+    })
+    return json.dumps(report, indent=2)
+
+
+def format_csv(result, params):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=SUMMARY_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(summary_rows(result))
+    return output.getvalue()
+
+
+def format_text(result, params):
+    months = (params['end_year'] - params['start_year'] + 1) * 12
+    lines = [
+        f"Pension amount in {params['end_year']}: {params['pension_2025']:,.2f} RUB",
+        f"Analysis period: {params['start_year']}-{params['end_year']}",
+        f"Total paid: {result['total_paid']:,.0f} RUB",
+        f"Average monthly losses: {result['total_compensation'] / months:,.0f} RUB",
+        f"Total losses: {result['total_compensation']:,.0f} RUB",
+        f"Loss percentage: {result['loss_percentage']:.2f}%"
+    ]
+    return '\n'.join(line.replace(',', ' ') for line in lines)
+
+
+FORMATTERS = {'json': format_json, 'csv': format_csv, 'text': format_text}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inflation lag compensation calculator")
+    parser.add_argument('--pension', type=float, required=True, help="Pension amount in the end year (RUB)")
+    parser.add_argument('--start', type=int, required=True, help="Analysis start year")
+    parser.add_argument('--end', type=int, default=2025, help="Analysis end year")
+    parser.add_argument('--data', default=inflation_data.default_data_path(),
+                        help="Excel file with inflation data")
+    parser.add_argument('--format', choices=sorted(FORMATTERS), default='text')
+    parser.add_argument('--output', help="Also write yearly summary to a CSV, Parquet or Arrow file")
+    parser.add_argument('--details', help="Write monthly details to a CSV, Parquet or Arrow file")
+    parser.add_argument('--compression', help=exporters.COMPRESSION_HELP)
+    parser.add_argument('--store', nargs='?', const='', metavar='PATH',
+                        help="Use the SQLite data store (default: next to the data file)")
+    parser.add_argument('--data-version', type=int,
+                        help="Calculate with a stored version of the dataset (requires --store)")
+    args = parser.parse_args(argv)
+
+    if args.pension <= 0:
+        parser.error("Pension amount must be positive")
+    if args.start >= args.end:
+        parser.error("Start year must be less than end year")
+    if args.data_version is not None and args.store is None:
+        parser.error("--data-version requires --store")
+
+    if args.store is None:
+        index = inflation_data.load_year_index(args.data)
+        result = compensation_engine.calculate_compensation(index, args.pension, args.start, args.end)
+    else:
+        import data_store
+
+        with data_store.DataStore(args.store or data_store.default_store_path(args.data)) as store:
+            dataset = store.import_file(args.data)
+            if args.data_version is not None:
+                dataset = store.version(dataset['name'], args.data_version)
+                if dataset is None:
+                    parser.error(f"Dataset version {args.data_version} not found")
+            index = store.year_index(dataset['id'])
+            cache = compensation_engine.ResultCache(store=store)
+            result = cache.calculate_compensation(index, args.pension, args.start, args.end)
+
+    params = {'pension_2025': args.pension, 'start_year': args.start, 'end_year': args.end}
+    sys.stdout.write(FORMATTERS[args.format](result, params) + '\n')
+
+    if args.output:
+        exporters.write_columns(args.output, result['summary_columns'], args.compression)
+    if args.details:
+        exporters.write_columns(args.details, result['details'].columns, args.compression)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Streaming compensation calculation for files of pensioner records.
+
+Input is a CSV or Parquet file with columns id, pension_2025 and start_year,
+and optionally start_month, the first paid month. Records are read in
+fixed-size chunks, each chunk is calculated with calculate_compensation_batch
+and written out before the next one is read, so memory use does not depend
+on the number of pensioners.
+
+With start_month or indexation events within the year (--event 2022-06:10)
+the monthly model of calculate_compensation_cohort is used; pension_2025 is
+then the December pension of the end year.
+
+With several workers the chunks are processed by a process pool. The
+inflation table is published once through shared memory and each worker
+builds its YearIndex from it; results are written in input order.
+
+Usage:
+    python cohort.py pensioners.csv results.csv --chunk-size 100000
+    python cohort.py pensioners.csv results.csv --workers 0   # all cores
+    python cohort.py pensioners.parquet results.xlsx          # streamed Excel workbook
+    python cohort.py pensioners.csv results.arrow             # memory-mappable Arrow file
+    python cohort.py pensioners.csv results.csv --event 2022-06:10
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import compensation_engine
+import exporters
+import inflation_data
+
+INPUT_COLUMNS = ['id', 'pension_2025', 'start_year']
+# First paid month, January if the column is absent
+OPTIONAL_COLUMNS = ['start_month']
+OUTPUT_COLUMNS = ['id', 'total_paid', 'total_compensation', 'loss_percentage']
+DEFAULT_CHUNK_SIZE = 100_000
+# Offending ids quoted in validation errors
+MAX_REPORTED_IDS = 10
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def missing_columns(path):
+    """Required input columns absent from the header of a CSV or Parquet file"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        names = pq.ParquetFile(path).schema_arrow.names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return [column for column in INPUT_COLUMNS if column not in names]
+
+
+def read_pensioner_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of pensioner records from CSV or Parquet file"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        columns = INPUT_COLUMNS + [col for col in OPTIONAL_COLUMNS if col in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        columns = INPUT_COLUMNS + OPTIONAL_COLUMNS
+        yield from pd.read_csv(path, usecols=lambda col: col in columns, chunksize=chunk_size)
+
+
+def parse_event(text):
+    """Indexation event 'YYYY-MM:rate' as (year, month, rate in percent)"""
+    try:
+        date, rate = text.split(':')
+        year, month = date.split('-')
+        year, month, rate = int(year), int(month), float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM:rate, got {text!r}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"Month must be between 1 and 12, got {text!r}")
+    return year, month, rate
+
+
+def _numeric_column(chunk, column, valid):
+    """Column of a chunk as floats; raises ValueError naming records with missing or invalid values
+
+    valid(values) marks the acceptable values; blank and non-numeric cells are NaN.
+    """
+    values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+    invalid = ~valid(values)
+    if invalid.any():
+        ids = chunk['id'].to_numpy()[invalid]
+        listed = ', '.join(str(value) for value in ids[:MAX_REPORTED_IDS])
+        more = f" and {len(ids) - MAX_REPORTED_IDS} more" if len(ids) > MAX_REPORTED_IDS else ''
+        raise ValueError(f"Missing or invalid {column} for id {listed}{more}")
+    return values
+
+
+def _is_integer(values):
+    return np.isfinite(values) & (values == np.floor(values))
+
+
+def pensions_2025(chunk):
+    """End-year pensions of a chunk; raises ValueError naming records without a finite amount"""
+    return _numeric_column(chunk, 'pension_2025', np.isfinite)
+
+
+def start_years(chunk):
+    """Start years of a chunk; raises ValueError naming records without a whole year"""
+    return _numeric_column(chunk, 'start_year', _is_integer).astype(np.int64)
+
+
+def start_months(chunk):
+    """First paid months of a chunk; raises ValueError naming records with missing or invalid months"""
+    months = _numeric_column(chunk, 'start_month', lambda values: _is_integer(values) & (values >= 1) & (values <= 12))
+    return months.astype(np.int64)
+
+
+def process_chunks(chunks, index, end_year=2025, events=()):
+    """Yield per-person totals for each chunk of pensioner records
+
+    Chunks with a start_month column, or any indexation events, are
+    calculated with the monthly model; its timeline is built once.
+    """
+    timeline = None
+    for chunk in chunks:
+        pensions = pensions_2025(chunk)
+        years = start_years(chunk)
+        if events or 'start_month' in chunk:
+            if timeline is None:
+                timeline = compensation_engine.MonthlyTimeline(index, end_year, events)
+            months = start_months(chunk) if 'start_month' in chunk else 1
+            totals = compensation_engine.calculate_compensation_cohort(
+                index, pensions, years, months, timeline=timeline
+            )
+        else:
+            totals = compensation_engine.calculate_compensation_batch(index, pensions, years, end_year)
+        yield pd.DataFrame({'id': chunk['id'].to_numpy(), **totals}, columns=OUTPUT_COLUMNS)
+
+
+def write_results(results, path, compression=None):
+    """Stream result chunks to CSV, Parquet, Arrow or Excel file, return number of rows"""
+    if os.path.splitext(path)[1].lower() == '.xlsx':
+        return exporters.write_excel_table(path, results, "Cohort Results", OUTPUT_COLUMNS)
+    return exporters.write_frames(results, path, compression)
+
+
+def _publish_table(index):
+    """Copy year, inflation and indexation arrays into shared memory"""
+    table = np.stack([index.years.astype(float), index.inflation, index.indexation])
+    shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+    np.ndarray(table.shape, dtype=table.dtype, buffer=shm.buf)[:] = table
+    return shm, table.shape
+
+
+# Year index of a worker process, built from shared memory
+_worker_index = None
+
+
+def _attach_table(shm_name, shape):
+    """Pool initializer: build the worker's YearIndex from shared memory"""
+    global _worker_index
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        _worker_index = compensation_engine.YearIndex(table[0].astype(np.int64), table[1], table[2])
+    finally:
+        shm.close()
+
+
+def _process_shard(shard, end_year, events):
+    """Calculate one shard of pensioner records in a worker"""
+    return next(process_chunks([shard], _worker_index, end_year, events))
+
+
+def process_chunks_parallel(chunks, index, end_year=2025, workers=None, events=()):
+    """Yield per-person totals for each chunk, calculated on a process pool
+
+    Results are yielded in input order. At most two chunks per worker are
+    in flight, so memory use stays bounded.
+    """
+    workers = workers or os.cpu_count() or 1
+    shm, shape = _publish_table(index)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_table,
+                                 initargs=(shm.name, shape)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_process_shard, chunk, end_year, events))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def calculate_compensation_parallel(index, pensions_2025, start_years, end_year=2025, workers=None):
+    """Split arrays of pensions into shards and calculate them on all cores"""
+    workers = workers or os.cpu_count() or 1
+    pensions, starts = np.broadcast_arrays(np.asarray(pensions_2025, dtype=float),
+                                           np.asarray(start_years, dtype=np.int64))
+    shards = (
+        pd.DataFrame({'id': ids, 'pension_2025': pensions[ids], 'start_year': starts[ids]})
+        for ids in np.array_split(np.arange(pensions.size), workers)
+    )
+    merged = pd.concat(process_chunks_parallel(shards, index, end_year, workers), ignore_index=True)
+    return {column: merged[column].to_numpy() for column in OUTPUT_COLUMNS[1:]}
+
+
+def run_cohort(input_path, output_path, index, chunk_size=DEFAULT_CHUNK_SIZE, end_year=2025, workers=1,
+               compression=None, events=()):
+    """Calculate totals for every pensioner in input file
+
+    workers=1 runs in the current process, workers=None uses all cores.
+    compression is passed to exporters.write_frames. events are
+    indexations within the year as (year, month, rate in percent).
+    """
+    chunks = read_pensioner_chunks(input_path, chunk_size)
+    if workers == 1:
+        results = process_chunks(chunks, index, end_year, events)
+    else:
+        results = process_chunks_parallel(chunks, index, end_year, workers, events)
+    return write_results(results, output_path, compression)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inflation lag compensation for a file of pensioners")
+    parser.add_argument('input', help="CSV or Parquet file with id, pension_2025, start_year[, start_month]")
+    parser.add_argument('output', help="CSV, Parquet, Arrow or Excel file for per-person totals")
+    parser.add_argument('--data', default=inflation_data.default_data_path(),
+                        help="Excel file with inflation data")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--end-year', type=int, default=2025)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes, 0 for all cores")
+    parser.add_argument('--compression', help=exporters.COMPRESSION_HELP)
+    parser.add_argument('--event', type=parse_event, action='append', default=[], metavar='YYYY-MM:RATE',
+                        help="Indexation within the year, e.g. 2022-06:10 (repeatable)")
+    args = parser.parse_args(argv)
+
+    missing = missing_columns(args.input)
+    if missing:
+        parser.error(f"Missing columns in {args.input}: {', '.join(missing)}")
+
+    df, _ = inflation_data.load_inflation_table(args.data)
+    index = compensation_engine.YearIndex.from_dataframe(df)
+    try:
+        rows = run_cohort(args.input, args.output, index, args.chunk_size, args.end_year,
+                          args.workers or None, args.compression, args.event)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Processed {rows} pensioners: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
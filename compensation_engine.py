@@ -0,0 +1,818 @@
+"""Inflation lag compensation engine without Qt dependencies.
+
+The inflation table (years, inflation and indexation in percent) is wrapped
+in a YearIndex once per dataset. The functions in this module reproduce the
+calculation performed by the GUI, so they can be used in batch jobs and
+server processes.
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+
+MONTHS = np.arange(1, 13)
+
+# Maximum absolute difference between series_coefficients and the monthly loop
+SERIES_TOLERANCE = 1e-12
+
+
+def _as_table(years, inflation, indexation):
+    """Sort yearly data by year, keeping the first row of duplicated years"""
+    years = np.asarray(years, dtype=np.int64)
+    inflation = np.asarray(inflation, dtype=float)
+    indexation = np.asarray(indexation, dtype=float)
+
+    # First row wins, as with df[df['year'] == year].iloc[0]
+    unique_years, first_rows = np.unique(years, return_index=True)
+    return unique_years, inflation[first_rows], indexation[first_rows]
+
+
+def _content_hash(years, inflation, indexation):
+    """Digest of the inflation table that identifies it in result caches"""
+    digest = hashlib.sha1()
+    for array in (years, inflation, indexation):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def monthly_price_growth(inflation):
+    """Price growth (1 + π)^m since year start for months 1..12 of each year"""
+    inflation_rate = np.asarray(inflation, dtype=float)[..., np.newaxis] / 100.0
+    monthly_inflation = (1.0 + inflation_rate) ** (1.0 / 12.0) - 1.0
+    return (1.0 + monthly_inflation) ** MONTHS
+
+
+def monthly_depreciation(inflation):
+    """Payment depreciation 1 - (1 + i)^(-m/12) for months 1..12 of each year"""
+    return 1.0 - 1.0 / monthly_price_growth(inflation)
+
+
+def series_coefficients(inflation):
+    """Series sum ∑[1 - (1 + i)^(-m/12)] for each year in closed form
+
+    With v = (1 + i)^(-1/12) the series is geometric:
+    ∑[1 - v^m] = 12 - v(1 - v^12)/(1 - v), where 1 - v^12 = i/(1 + i).
+    1 - v is computed with expm1/log1p to avoid cancellation at low
+    inflation; zero inflation gives a zero coefficient.
+
+    Agrees with the 12-step monthly loop within SERIES_TOLERANCE (absolute,
+    in monthly pensions) for inflation from -50% to 1000%; the measured
+    maximum difference is about 1.4e-14.
+    """
+    inflation_rate = np.asarray(inflation, dtype=float) / 100.0
+    one_minus_v = -np.expm1(-np.log1p(inflation_rate) / 12.0)
+    no_inflation = one_minus_v == 0.0
+    tail = (1.0 - one_minus_v) * (inflation_rate / (1.0 + inflation_rate))
+    tail = tail / np.where(no_inflation, 1.0, one_minus_v)
+    return np.where(no_inflation, 0.0, 12.0 - tail)
+
+
+class YearIndex:
+    """Inflation table indexed by year for O(1) lookups
+
+    Built once per dataset. Holds contiguous arrays sorted by year, the
+    cumulative indexation of pensions and the series coefficient of every
+    year. Cumulative indexation is kept as prefix sums of log(1 + indexation)
+    so that long histories do not overflow.
+    """
+
+    def __init__(self, years, inflation, indexation):
+        self.years, self.inflation, self.indexation = _as_table(years, inflation, indexation)
+        # log_growth[k]: log of the indexation product over the first k data years
+        self.log_growth = np.concatenate(([0.0], np.cumsum(np.log1p(self.indexation / 100.0))))
+        self.coefficients = series_coefficients(self.inflation)
+        self.positions = {int(year): pos for pos, year in enumerate(self.years)}
+
+        # Identifies the dataset in result caches
+        self.content_hash = _content_hash(self.years, self.inflation, self.indexation)
+
+        # Number of data years <= year for every year of the covered range
+        if len(self.years):
+            self.first_year = int(self.years[0])
+            self.last_year = int(self.years[-1])
+            covered = np.arange(self.first_year, self.last_year + 1)
+            self._counts = np.searchsorted(self.years, covered, side='right').tolist()
+        else:
+            self.first_year = self.last_year = None
+            self._counts = []
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build index from a DataFrame with year, inflation_rosstat and indexation"""
+        return cls(df['year'].to_numpy(), df['inflation_rosstat'].to_numpy(), df['indexation'].to_numpy())
+
+    def __len__(self):
+        return len(self.years)
+
+    def __contains__(self, year):
+        return year in self.positions
+
+    def with_values(self, year, inflation=None, indexation=None):
+        """Copy of the index with new inflation and/or indexation of one data year
+
+        Only values that depend on the change are recomputed: the series
+        coefficient of the year for inflation, and the cumulative indexation
+        from the year on for indexation. The result is identical to building
+        a new index from the edited table.
+        """
+        pos = self.positions[year]
+        index = copy.copy(self)
+        if inflation is not None:
+            index.inflation = self.inflation.copy()
+            index.inflation[pos] = inflation
+            index.coefficients = self.coefficients.copy()
+            index.coefficients[pos] = series_coefficients(index.inflation[pos:pos + 1])[0]
+        if indexation is not None:
+            index.indexation = self.indexation.copy()
+            index.indexation[pos] = indexation
+            # Continue the running sum from the unchanged prefix
+            index.log_growth = self.log_growth.copy()
+            index.log_growth[pos + 1:] = np.cumsum(np.concatenate(
+                ([self.log_growth[pos]], np.log1p(index.indexation[pos:] / 100.0))
+            ))[1:]
+        index.content_hash = _content_hash(index.years, index.inflation, index.indexation)
+        return index
+
+    @property
+    def cumulative_indexation(self):
+        """Product of (1 + indexation) from the first data year through each year"""
+        return np.exp(self.log_growth[1:])
+
+    def count_upto(self, year):
+        """Number of data years not later than year"""
+        if not self._counts or year < self.first_year:
+            return 0
+        if year > self.last_year:
+            return len(self.years)
+        return self._counts[year - self.first_year]
+
+    def window(self, start_year, end_year):
+        """Slice of data positions with start_year <= year <= end_year"""
+        first = self.count_upto(start_year - 1)
+        return slice(first, max(first, self.count_upto(end_year)))
+
+    def indexation_growth(self, from_year, to_year):
+        """Pension growth from indexations of data years in (from_year, to_year]"""
+        return float(np.exp(self.log_growth[self.count_upto(to_year)] - self.log_growth[self.count_upto(from_year)]))
+
+    def pension_in_year(self, pension_end, year, end_year):
+        """Restore pension of a year from the end-year amount"""
+        return pension_end / self.indexation_growth(year, end_year)
+
+    def series_coefficient(self, year):
+        """Series coefficient ∑[1 - (1 + i)^(-m/12)] of a data year"""
+        return float(self.coefficients[self.positions[year]])
+
+
+class UnitResult:
+    """Calculation for a pension of 1 RUB in the end year
+
+    Every output of the calculation is linear in the pension amount, so a
+    unit result is computed once per window and rescaled to any amount.
+    """
+
+    def __init__(self, index, start_year, end_year):
+        self.start_year = start_year
+        self.end_year = end_year
+        self.content_hash = index.content_hash
+
+        # Restore pensions from the end-year amount
+        self.yearly_pensions = {end_year: 1.0}
+        for year in range(end_year - 1, start_year - 1, -1):
+            self.yearly_pensions[year] = index.pension_in_year(1.0, year, end_year)
+
+        window = index.window(start_year, end_year)
+        self.years = index.years[window].tolist()
+        self.inflation = index.inflation[window]
+        self.indexation = index.indexation[window]
+        self.coefficients = index.coefficients[window]
+        self.pensions = np.array([self.yearly_pensions[year] for year in self.years])
+        self.price_growth = monthly_price_growth(self.inflation)
+
+    @classmethod
+    def from_columns(cls, content_hash, start_year, end_year, yearly_pensions, years, inflation, indexation,
+                     coefficients):
+        """Unit result restored from stored values, without the index
+
+        yearly_pensions maps every year of the window to its unit pension;
+        the other arguments hold the window's data years.
+        """
+        unit = cls.__new__(cls)
+        unit.start_year = start_year
+        unit.end_year = end_year
+        unit.content_hash = content_hash
+        unit.yearly_pensions = dict(yearly_pensions)
+        unit.years = list(years)
+        unit.inflation = np.asarray(inflation, dtype=float)
+        unit.indexation = np.asarray(indexation, dtype=float)
+        unit.coefficients = np.asarray(coefficients, dtype=float)
+        unit.pensions = np.array([unit.yearly_pensions[year] for year in unit.years])
+        unit.price_growth = monthly_price_growth(unit.inflation)
+        return unit
+
+    def scale(self, pension_2025):
+        """Results of calculate_compensation for the given pension"""
+        yearly_summary = {}
+        total_paid = 0.0
+        total_compensation = 0.0
+        pensions = (pension_2025 * self.pensions).tolist()
+        coefficients = self.coefficients.tolist()
+        inflation = self.inflation.tolist()
+        indexation = self.indexation.tolist()
+
+        for offset, year in enumerate(self.years):
+            pension = pensions[offset]
+            year_paid = pension * 12.0
+            year_compensation = pension * coefficients[offset]
+
+            total_paid += year_paid
+            total_compensation += year_compensation
+
+            yearly_summary[year] = {
+                'pension_in_january': pension,
+                'inflation_year': inflation[offset],
+                'indexation_year': indexation[offset],
+                'sum_per_year': year_paid,
+                'compensation_per_year': year_compensation,
+                'compensation_per_month': year_compensation / 12.0,
+                'loss_percentage': (year_compensation / year_paid * 100.0) if year_paid > 0 else 0.0,
+                'total_compensation': total_compensation
+            }
+
+        return {
+            'total_paid': total_paid,
+            'total_compensation': total_compensation,
+            'loss_percentage': (total_compensation / total_paid * 100.0) if total_paid > 0 else 0.0,
+            'details': MonthlyDetails(self, pension_2025),
+            'yearly_summary': yearly_summary,
+            'summary_columns': self.summary_columns(pension_2025),
+            'pension_2025': pension_2025,
+            'unit_result': self,
+            'yearly_pensions': {year: pension_2025 * unit for year, unit in self.yearly_pensions.items()}
+        }
+
+    def summary_columns(self, pension_2025):
+        """Yearly summary as column arrays, keyed like yearly_summary entries"""
+        pensions = pension_2025 * self.pensions
+        paid = pensions * 12.0
+        compensation = pensions * self.coefficients
+        return {
+            'year': np.array(self.years, dtype=np.int64),
+            'pension_in_january': pensions,
+            'inflation_year': self.inflation,
+            'indexation_year': self.indexation,
+            'sum_per_year': paid,
+            'compensation_per_year': compensation,
+            'compensation_per_month': compensation / 12.0,
+            'loss_percentage': np.divide(compensation * 100.0, paid, out=np.zeros_like(paid), where=paid > 0),
+            'total_compensation': np.cumsum(compensation)
+        }
+
+    def detail_columns(self, pension_2025):
+        """Monthly details as column arrays, keyed like details records"""
+        pensions = np.round(pension_2025 * self.pensions, 4)
+        compensation = pension_2025 * self.pensions[:, np.newaxis] * (1.0 - 1.0 / self.price_growth)
+        return {
+            'Year': np.repeat(np.array(self.years, dtype=np.int64), 12),
+            'Month': np.tile(MONTHS, len(self.years)),
+            'Pension': np.repeat(pensions, 12),
+            'Paid': np.repeat(pensions, 12),
+            'Compensation': np.round(compensation, 4).ravel()
+        }
+
+    def methodology_data(self, pension_2025):
+        """Data for the methodology report for the given pension"""
+        yearly_pensions = {year: pension_2025 * unit for year, unit in self.yearly_pensions.items()}
+
+        # Select last 3 years for detailed analysis
+        analysis_years = list(range(max(self.start_year, self.end_year - 2), self.end_year + 1))
+
+        method_data = {
+            'pension_2025': pension_2025,
+            'start_year': self.start_year,
+            'end_year': self.end_year,
+            'yearly_pensions': yearly_pensions,
+            'analysis_years': analysis_years,
+            'compensation_details': [],
+            'total_compensation': 0.0
+        }
+
+        # Calculation for each analysis year
+        for offset, year in enumerate(self.years):
+            if year not in analysis_years:
+                continue
+
+            inflation_rate = self.inflation[offset] / 100
+            pension = yearly_pensions[year]
+            monthly_inflation = (1 + inflation_rate) ** (1 / 12) - 1
+            series_sum = float(self.coefficients[offset])
+
+            monthly_details = []
+            for month, price_growth in zip(MONTHS.tolist(), self.price_growth[offset].tolist()):
+                monthly_details.append({
+                    'month': month,
+                    'price_growth': price_growth,
+                    'monthly_compensation': pension * (1 - 1 / price_growth)
+                })
+
+            # Total compensation for the year
+            year_compensation = pension * series_sum
+
+            method_data['compensation_details'].append({
+                'year': year,
+                'pension': pension,
+                'inflation_rate': inflation_rate * 100,
+                'monthly_inflation': monthly_inflation * 100,
+                'series_sum': series_sum,
+                'compensation': year_compensation,
+                'avg_monthly': year_compensation / 12,
+                'monthly_details': monthly_details,
+                'percentage_of_pension': (year_compensation / (pension * 12)) * 100
+            })
+
+            method_data['total_compensation'] += year_compensation
+
+        return method_data
+
+
+class MonthlyDetails(Sequence):
+    """Monthly records of a result, built only when they are accessed
+
+    Behaves like the list of dicts with keys Year, Month, Pension, Paid
+    and Compensation (values rounded to 4 decimals). Only the unit result
+    and the pension amount are stored; columns gives all records as arrays.
+    """
+
+    KEYS = ('Year', 'Month', 'Pension', 'Paid', 'Compensation')
+
+    def __init__(self, unit, pension_2025):
+        self._unit = unit
+        self._pension = pension_2025
+        self._columns = None
+
+    def __len__(self):
+        return len(self._unit.years) * 12
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._record(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("monthly record index out of range")
+        return self._record(i)
+
+    def __iter__(self):
+        unit = self._unit
+        pensions = (self._pension * unit.pensions).tolist()
+        for offset, growth in enumerate(unit.price_growth.tolist()):
+            pension = pensions[offset]
+            rounded_pension = round(pension, 4)
+            for month, price_growth in enumerate(growth, 1):
+                yield {
+                    'Year': unit.years[offset],
+                    'Month': month,
+                    'Pension': rounded_pension,
+                    'Paid': rounded_pension,
+                    'Compensation': round(pension * (1.0 - 1.0 / price_growth), 4)
+                }
+
+    def __eq__(self, other):
+        if isinstance(other, (MonthlyDetails, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"MonthlyDetails({len(self)} records)"
+
+    def _record(self, i):
+        offset, month = divmod(i, 12)
+        pension = self._pension * float(self._unit.pensions[offset])
+        price_growth = float(self._unit.price_growth[offset, month])
+        rounded_pension = round(pension, 4)
+        return {
+            'Year': self._unit.years[offset],
+            'Month': month + 1,
+            'Pension': rounded_pension,
+            'Paid': rounded_pension,
+            'Compensation': round(pension * (1.0 - 1.0 / price_growth), 4)
+        }
+
+    @property
+    def columns(self):
+        """All records as column arrays keyed like the records"""
+        if self._columns is None:
+            self._columns = self._unit.detail_columns(self._pension)
+        return self._columns
+
+
+class ResultCache:
+    """LRU cache of unit results keyed by dataset and analysis window
+
+    Repeated queries for the same dataset, start and end year only rescale
+    the stored unit result. Safe to use from background threads.
+
+    With a store (data_store.DataStore) unit results missing in memory are
+    looked up in the store, and newly computed ones are saved to it, so
+    they survive the session.
+    """
+
+    def __init__(self, maxsize=256, store=None):
+        self.maxsize = maxsize
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def migrate(self, old_index, new_index, changed_years):
+        """Keep unit results that an edit of the table does not affect
+
+        A unit result depends on the data of its own window only, so results
+        of windows that contain none of changed_years are moved to the new
+        dataset; results of the others are dropped. Returns the number of
+        moved results.
+        """
+        changed = sorted(changed_years)
+        moved = 0
+        with self._lock:
+            for key in list(self._results):
+                content_hash, start_year, end_year = key
+                if content_hash != old_index.content_hash:
+                    continue
+                unit = self._results.pop(key)
+                if not any(start_year <= year <= end_year for year in changed):
+                    self._results[(new_index.content_hash, start_year, end_year)] = unit
+                    moved += 1
+        return moved
+
+    def contains(self, index, start_year, end_year):
+        """Whether the unit result of the window is cached"""
+        with self._lock:
+            return (index.content_hash, start_year, end_year) in self._results
+
+    def unit_result(self, index, start_year, end_year):
+        """Unit result for the window, computed on first request"""
+        key = (index.content_hash, start_year, end_year)
+        with self._lock:
+            unit = self._results.get(key)
+            if unit is not None:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return unit
+
+        unit = None
+        if self.store is not None:
+            unit = self.store.load_unit_result(index.content_hash, start_year, end_year)
+        if unit is None:
+            unit = UnitResult(index, start_year, end_year)
+            if self.store is not None:
+                self.store.save_unit_result(unit)
+        with self._lock:
+            self.misses += 1
+            self._results[key] = unit
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return unit
+
+    def calculate_compensation(self, index, pension_2025, start_year, end_year):
+        """Cached equivalent of calculate_compensation"""
+        return self.unit_result(index, start_year, end_year).scale(pension_2025)
+
+    def methodology_data(self, index, pension_2025, start_year, end_year):
+        """Methodology data served from the same cached unit result"""
+        return self.unit_result(index, start_year, end_year).methodology_data(pension_2025)
+
+
+def calculate_compensation(index, pension_2025, start_year, end_year):
+    """Calculate inflation lag compensation for a single pension"""
+    return UnitResult(index, start_year, end_year).scale(pension_2025)
+
+
+class WindowTable:
+    """Per-unit totals for every (start_year, end_year) window
+
+    Built once per dataset from prefix sums, so the totals of any window are
+    an O(1) lookup. Growth factors are taken relative to the middle of the
+    cumulative indexation range to keep the sums finite for long histories.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.years = index.years
+        self._log_growth = index.log_growth
+        self._reference = (index.log_growth.max() + index.log_growth.min()) / 2.0
+
+        # Prefix sums of pensions and compensations relative to the reference
+        relative_pensions = np.exp(index.log_growth[1:] - self._reference)
+        self._paid_prefix = np.concatenate(([0.0], np.cumsum(relative_pensions * 12.0)))
+        self._compensation_prefix = np.concatenate(
+            ([0.0], np.cumsum(relative_pensions * index.coefficients))
+        )
+        self._all_windows = None
+
+    def updated(self, index, year):
+        """Window table of an index edited with YearIndex.with_values at year
+
+        Prefix sums before the year are unchanged and reused; the rest is
+        continued from them. The reference point is kept.
+        """
+        pos = index.positions[year]
+        table = copy.copy(self)
+        table.index = index
+        table._log_growth = index.log_growth
+        relative_pensions = np.exp(index.log_growth[pos + 1:] - self._reference)
+        table._paid_prefix = self._paid_prefix.copy()
+        table._paid_prefix[pos + 1:] = np.cumsum(np.concatenate(
+            ([self._paid_prefix[pos]], relative_pensions * 12.0)
+        ))[1:]
+        table._compensation_prefix = self._compensation_prefix.copy()
+        table._compensation_prefix[pos + 1:] = np.cumsum(np.concatenate(
+            ([self._compensation_prefix[pos]], relative_pensions * index.coefficients[pos:])
+        ))[1:]
+        table._all_windows = None
+        return table
+
+    def _totals_at(self, first, last):
+        """Per-unit totals for data positions first..last-1 with the pension ending at last"""
+        scale = np.exp(self._reference - self._log_growth[last])
+        empty = last <= first
+        total_paid = np.where(empty, 0.0, scale * (self._paid_prefix[last] - self._paid_prefix[first]))
+        total_compensation = np.where(
+            empty, 0.0, scale * (self._compensation_prefix[last] - self._compensation_prefix[first])
+        )
+        loss_percentage = np.divide(
+            total_compensation * 100.0, total_paid,
+            out=np.zeros_like(total_paid), where=total_paid > 0
+        )
+        return {
+            'total_paid': total_paid,
+            'total_compensation': total_compensation,
+            'loss_percentage': loss_percentage
+        }
+
+    def totals(self, start_years, end_years):
+        """Per-unit totals for arrays of start and end years"""
+        starts, ends = np.broadcast_arrays(np.asarray(start_years, dtype=np.int64),
+                                           np.asarray(end_years, dtype=np.int64))
+        first = np.searchsorted(self.years, starts, side='left')
+        last = np.searchsorted(self.years, ends, side='right')
+        return self._totals_at(first, last)
+
+    def window(self, start_year, end_year, pension=1.0):
+        """Totals of one window for the given end-year pension"""
+        totals = self._totals_at(self.index.count_upto(start_year - 1), self.index.count_upto(end_year))
+        return {
+            'total_paid': pension * float(totals['total_paid']),
+            'total_compensation': pension * float(totals['total_compensation']),
+            'loss_percentage': float(totals['loss_percentage'])
+        }
+
+    def all_windows(self):
+        """Triangular tables of per-unit totals for every pair of data years
+
+        Element [s, e] refers to start year years[s] and end year years[e];
+        windows with start after end are NaN. Computed on first request.
+        """
+        if self._all_windows is None:
+            positions = np.arange(len(self.years))
+            first = positions[:, np.newaxis]
+            last = positions[np.newaxis, :] + 1
+            totals = self._totals_at(first, last)
+            upper = first < last
+            self._all_windows = {key: np.where(upper, value, np.nan) for key, value in totals.items()}
+            self._all_windows['years'] = self.years
+        return self._all_windows
+
+
+class MonthlyTimeline:
+    """Month-by-month pensions and losses with indexations within the year
+
+    Covers the data years up to end_year. The indexation of the table takes
+    effect in January; events are further indexations (year, month, rate in
+    percent) taking effect in their month, such as the extraordinary June
+    2022 indexation. Events outside the covered data years are ignored.
+    Pensions are per 1 RUB paid in December of end_year.
+
+    The loss of a month is P_jan - P_m × v^m with v = (1 + i)^(-1/12): the
+    payment measured in prices of the year start against the pension level
+    in force in January. Without events this is P_jan × (1 - v^m), the
+    monthly term of the series coefficient.
+    """
+
+    def __init__(self, index, end_year=2025, events=()):
+        self.end_year = end_year
+        self.years = index.years[:index.count_upto(end_year)]
+        n_years = len(self.years)
+        positions = index.positions
+
+        # Log growth of the pension by the indexations taking effect in each month
+        log_factor = np.zeros((n_years, 12))
+        log_factor[:, 0] = np.log1p(index.indexation[:n_years] / 100.0)
+        for year, month, rate in events:
+            if not 1 <= month <= 12:
+                raise ValueError(f"Invalid indexation month: {month}")
+            if year in positions and positions[year] < n_years:
+                log_factor[positions[year], month - 1] += np.log1p(rate / 100.0)
+        log_factor = log_factor.ravel()
+
+        # Pension of each month relative to December of the end year
+        self.pensions = np.exp(np.cumsum(log_factor) - log_factor.sum())
+        january = np.repeat(self.pensions[::12], 12)
+        depreciation = 1.0 / monthly_price_growth(index.inflation[:n_years]).ravel()
+        self.losses = january - self.pensions * depreciation
+
+        # Totals from each month to the end of the timeline
+        self._paid_suffix = np.concatenate((np.cumsum(self.pensions[::-1])[::-1], [0.0]))
+        self._loss_suffix = np.concatenate((np.cumsum(self.losses[::-1])[::-1], [0.0]))
+
+    def first_months(self, start_years, start_months=1):
+        """Timeline position of the first paid month of each pensioner
+
+        A start year without data starts the payments in January of the next
+        data year, as calculate_compensation skips years without data. On an
+        empty timeline every position is the end, with nothing paid.
+        """
+        starts, months = np.broadcast_arrays(np.asarray(start_years, dtype=np.int64),
+                                             np.asarray(start_months, dtype=np.int64))
+        if np.any((months < 1) | (months > 12)):
+            raise ValueError("First payment months must be between 1 and 12")
+        if len(self.years) == 0:
+            return np.zeros(starts.shape, dtype=np.int64)
+        first = np.searchsorted(self.years, starts, side='left')
+        in_data = (first < len(self.years)) & (self.years[np.minimum(first, len(self.years) - 1)] == starts)
+        return np.minimum(first * 12 + np.where(in_data, months - 1, 0), len(self.pensions))
+
+    def totals_from(self, first_months):
+        """Per-unit totals of payments starting at timeline positions first_months"""
+        total_paid = self._paid_suffix[first_months]
+        total_compensation = self._loss_suffix[first_months]
+        return {
+            'total_paid': total_paid,
+            'total_compensation': total_compensation,
+            'loss_percentage': np.divide(
+                total_compensation * 100.0, total_paid,
+                out=np.zeros_like(total_paid), where=total_paid > 0
+            )
+        }
+
+
+def calculate_compensation_cohort(index, pensions_2025, start_years, start_months=1, end_year=2025, events=(),
+                                  timeline=None):
+    """Totals for pensioners with own first payment month and in-year indexations
+
+    pensions_2025 is each person's pension in December of end_year;
+    start_years and start_months give the first paid month. Months before
+    it are not paid and carry no losses. Per-unit totals are suffix sums of
+    the timeline, gathered by each person's first paid month, so the cost is
+    one lookup per person. Pass a MonthlyTimeline to reuse it across chunks;
+    events are then taken from it. Returns a dict of NumPy arrays like
+    calculate_compensation_batch.
+    """
+    if timeline is None:
+        timeline = MonthlyTimeline(index, end_year, events)
+    pensions = np.asarray(pensions_2025, dtype=float)
+    unit = timeline.totals_from(timeline.first_months(start_years, start_months))
+
+    total_paid = pensions * unit['total_paid']
+    total_compensation = pensions * unit['total_compensation']
+    loss_percentage = np.divide(
+        total_compensation * 100.0, total_paid,
+        out=np.zeros_like(total_paid), where=total_paid > 0
+    )
+
+    return {
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': loss_percentage
+    }
+
+
+def methodology_data(result):
+    """Methodology report data of a calculate_compensation result
+
+    Derived from the unit result the calculation already holds, so the
+    report always matches the result it describes.
+    """
+    return result['unit_result'].methodology_data(result['pension_2025'])
+
+
+def calculate_compensation_batch(index, pensions_2025, start_years, end_year=2025):
+    """Calculate totals for many pensions in one vectorized pass
+
+    pensions_2025, start_years and end_year are broadcast against each other.
+    Returns a dict of NumPy arrays: total_paid, total_compensation,
+    loss_percentage.
+    """
+    pensions = np.asarray(pensions_2025, dtype=float)
+    totals = WindowTable(index).totals(start_years, end_year)
+    total_paid = pensions * totals['total_paid']
+    total_compensation = pensions * totals['total_compensation']
+    loss_percentage = np.divide(
+        total_compensation * 100.0, total_paid,
+        out=np.zeros_like(total_paid), where=total_paid > 0
+    )
+
+    return {
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': loss_percentage
+    }
+
+
+def calculate_compensation_comparison(indexes, pension_2025, start_year, end_year):
+    """Yearly results of several datasets for one window in a single pass
+
+    The data of every YearIndex in indexes is aligned on the years
+    start_year..end_year into (datasets × years) arrays, which are then
+    evaluated together. Years missing from a dataset add neither payments
+    nor losses, as in calculate_compensation, and are NaN in the yearly
+    arrays. Returns years, per-dataset total_paid, total_compensation and
+    loss_percentage, and yearly arrays keyed like summary_columns.
+    """
+    years = np.arange(start_year, end_year + 1)
+    shape = (len(indexes), len(years))
+    inflation = np.zeros(shape)
+    indexation = np.zeros(shape)
+    present = np.zeros(shape, dtype=bool)
+    for row, index in enumerate(indexes):
+        window = index.window(start_year, end_year)
+        columns = index.years[window] - start_year
+        inflation[row, columns] = index.inflation[window]
+        indexation[row, columns] = index.indexation[window]
+        present[row, columns] = True
+
+    # Pensions restored from the end-year amount by the indexations of later years
+    log_growth = np.log1p(indexation / 100.0)
+    later = log_growth.sum(axis=1, keepdims=True) - np.cumsum(log_growth, axis=1)
+    pensions = pension_2025 * np.exp(-later)
+    paid = np.where(present, pensions * 12.0, 0.0)
+    compensation = np.where(present, pensions * series_coefficients(inflation), 0.0)
+
+    total_paid = paid.sum(axis=1)
+    total_compensation = compensation.sum(axis=1)
+    missing = ~present
+    yearly_loss = np.divide(compensation * 100.0, paid, out=np.zeros_like(paid), where=paid > 0)
+    return {
+        'years': years,
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': np.divide(
+            total_compensation * 100.0, total_paid,
+            out=np.zeros_like(total_paid), where=total_paid > 0
+        ),
+        'summary_columns': {
+            'pension_in_january': np.where(missing, np.nan, pensions),
+            'inflation_year': np.where(missing, np.nan, inflation),
+            'indexation_year': np.where(missing, np.nan, indexation),
+            'sum_per_year': np.where(missing, np.nan, paid),
+            'compensation_per_year': np.where(missing, np.nan, compensation),
+            'compensation_per_month': np.where(missing, np.nan, compensation / 12.0),
+            'loss_percentage': np.where(missing, np.nan, yearly_loss),
+            'total_compensation': np.where(missing, np.nan, np.cumsum(compensation, axis=1))
+        }
+    }
+
+
+def calculate_compensation_sweep(index, pensions_2025, start_years, end_years, window_table=None):
+    """Totals for every combination of pension, start year and end year
+
+    Evaluated as one broadcast over a (pensions × start years × end years)
+    grid of NumPy arrays; windows whose start year is not before the end
+    year are NaN. Pass the dataset's WindowTable to reuse its prefix sums.
+    The axes are returned as pensions_2025, start_years and end_years.
+    """
+    pensions = np.asarray(pensions_2025, dtype=float).reshape(-1)
+    starts = np.asarray(start_years, dtype=np.int64).reshape(-1)
+    ends = np.asarray(end_years, dtype=np.int64).reshape(-1)
+    if window_table is None:
+        window_table = WindowTable(index)
+
+    totals = window_table.totals(starts[:, np.newaxis], ends[np.newaxis, :])
+    valid = starts[:, np.newaxis] < ends[np.newaxis, :]
+    total_paid = np.where(valid, pensions[:, np.newaxis, np.newaxis] * totals['total_paid'], np.nan)
+    total_compensation = np.where(valid, pensions[:, np.newaxis, np.newaxis] * totals['total_compensation'],
+                                  np.nan)
+    loss_percentage = np.divide(
+        total_compensation * 100.0, total_paid,
+        out=np.where(np.isnan(total_paid), np.nan, 0.0), where=total_paid > 0
+    )
+
+    return {
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': loss_percentage,
+        'pensions_2025': pensions,
+        'start_years': starts,
+        'end_years': ends
+    }
@@ -0,0 +1,307 @@
+"""SQLite store of inflation datasets and calculated unit results.
+
+Every distinct content of a named dataset is kept as a new version; the
+yearly rows are indexed by dataset and year, so year ranges are read with
+an index scan. Data files are registered with their modification time,
+size and SHA-256, so an unchanged file is loaded from the store without
+parsing Excel. Unit results (calculations for a pension of 1 RUB) are kept
+by dataset content and analysis window, which lets repeat sessions and
+batch jobs skip recomputation: every pension amount is a rescaling of the
+unit result.
+
+Usage:
+    store = DataStore(default_store_path(data_path))
+    dataset = store.import_file(data_path)
+    index = store.year_index(dataset['id'])
+    cache = compensation_engine.ResultCache(store=store)
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+import compensation_engine
+import inflation_data
+
+STORE_FILENAME = 'pension_store.sqlite'
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    has_missing INTEGER NOT NULL DEFAULT 0,
+    created TEXT NOT NULL,
+    UNIQUE (name, version),
+    UNIQUE (name, content_hash)
+);
+CREATE TABLE IF NOT EXISTS dataset_years (
+    dataset_id INTEGER NOT NULL REFERENCES datasets (id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    inflation REAL NOT NULL,
+    indexation REAL NOT NULL,
+    PRIMARY KEY (dataset_id, year)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    dataset_id INTEGER NOT NULL REFERENCES datasets (id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS unit_results (
+    content_hash TEXT NOT NULL,
+    start_year INTEGER NOT NULL,
+    end_year INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    pension REAL NOT NULL,
+    inflation REAL,
+    indexation REAL,
+    coefficient REAL,
+    PRIMARY KEY (content_hash, start_year, end_year, year)
+) WITHOUT ROWID;
+"""
+
+DATASET_COLUMNS = ['id', 'name', 'version', 'content_hash', 'has_missing', 'created']
+
+
+def default_store_path(data_path=None):
+    """Store path from PENSION_STORE, else next to the data file"""
+    path = os.environ.get('PENSION_STORE')
+    if path:
+        return path
+    data_path = data_path or inflation_data.default_data_path()
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), STORE_FILENAME)
+
+
+class DataStore:
+    """Versioned inflation datasets and persistent unit results in SQLite
+
+    One connection is shared by all threads and serialized with a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > SCHEMA_VERSION:
+                self._conn.close()
+                raise ValueError(f"Store {path} was written by a newer version (schema {version})")
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            # Readers in other processes are not blocked by a writing session
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Datasets
+
+    def save_dataset(self, name, years, inflation, indexation, has_missing=False):
+        """Store a table as a new version of a named dataset
+
+        A table identical to an existing version of the dataset is not
+        stored again; that version is returned instead.
+        """
+        # Sorted, de-duplicated table as the calculations see it
+        index = compensation_engine.YearIndex(years, inflation, indexation)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM datasets WHERE name = ? AND content_hash = ?", (name, index.content_hash)
+            ).fetchone()
+            if row is None:
+                version = self._conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) + 1 FROM datasets WHERE name = ?", (name,)
+                ).fetchone()[0]
+                cursor = self._conn.execute(
+                    "INSERT INTO datasets (name, version, content_hash, has_missing, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (name, version, index.content_hash, int(has_missing),
+                     datetime.now().isoformat(timespec='seconds'))
+                )
+                dataset_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO dataset_years (dataset_id, year, inflation, indexation) VALUES (?, ?, ?, ?)",
+                    zip([dataset_id] * len(index), index.years.tolist(), index.inflation.tolist(),
+                        index.indexation.tolist())
+                )
+            else:
+                dataset_id = row[0]
+        return self.dataset(dataset_id)
+
+    def dataset(self, dataset_id):
+        """Dataset record by id, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(DATASET_COLUMNS)} FROM datasets WHERE id = ?", (dataset_id,)
+            ).fetchone()
+        return dict(zip(DATASET_COLUMNS, row)) if row else None
+
+    def datasets(self, name=None):
+        """Dataset records, optionally of one name, ordered by name and version"""
+        query = f"SELECT {', '.join(DATASET_COLUMNS)} FROM datasets"
+        args = ()
+        if name is not None:
+            query += " WHERE name = ?"
+            args = (name,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY name, version", args).fetchall()
+        return [dict(zip(DATASET_COLUMNS, row)) for row in rows]
+
+    def version(self, name, version):
+        """Given version of a named dataset, or None"""
+        return next((dataset for dataset in self.datasets(name) if dataset['version'] == version), None)
+
+    def latest(self, name):
+        """Latest version of a named dataset, or None"""
+        versions = self.datasets(name)
+        return versions[-1] if versions else None
+
+    def query_years(self, dataset_id, from_year=None, to_year=None):
+        """Years of a dataset in [from_year, to_year] as arrays keyed like the data file columns"""
+        query = "SELECT year, inflation, indexation FROM dataset_years WHERE dataset_id = ?"
+        args = [dataset_id]
+        if from_year is not None:
+            query += " AND year >= ?"
+            args.append(from_year)
+        if to_year is not None:
+            query += " AND year <= ?"
+            args.append(to_year)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY year", args).fetchall()
+        years, inflation, indexation = zip(*rows) if rows else ((), (), ())
+        return {
+            'year': np.array(years, dtype=np.int64),
+            'inflation_rosstat': np.array(inflation, dtype=float),
+            'indexation': np.array(indexation, dtype=float)
+        }
+
+    def year_index(self, dataset_id):
+        """YearIndex of a stored dataset"""
+        arrays = self.query_years(dataset_id)
+        return compensation_engine.YearIndex(arrays['year'], arrays['inflation_rosstat'], arrays['indexation'])
+
+    # Data files
+
+    def import_file(self, path, name=None):
+        """Dataset of a data file, parsing the file only if it changed
+
+        name defaults to the absolute path of the file, so files of the same
+        name in different folders are separate datasets. A changed file is
+        stored as a new version of the dataset. Raises the errors of
+        inflation_data.load_table_arrays for files that cannot be read.
+        """
+        path = os.path.abspath(path)
+        name = name or path
+        source_stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, sha256, dataset_id FROM sources WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and row[0] == source_stat.st_mtime_ns and row[1] == source_stat.st_size:
+            dataset = self.dataset(row[3])
+            if dataset is not None and dataset['name'] == name:
+                return dataset
+
+        # Source touched but maybe not changed: compare contents
+        digest = inflation_data.file_hash(path)
+        dataset = self.dataset(row[3]) if row is not None and row[2] == digest else None
+        if dataset is None or dataset['name'] != name:
+            arrays, has_missing = inflation_data.load_table_arrays(path)
+            dataset = self.save_dataset(name, arrays['year'], arrays['inflation_rosstat'], arrays['indexation'],
+                                        has_missing)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (path, mtime_ns, size, sha256, dataset_id) VALUES (?, ?, ?, ?, ?)",
+                (path, source_stat.st_mtime_ns, source_stat.st_size, digest, dataset['id'])
+            )
+        return dataset
+
+    def load_table_arrays(self, path, name=None):
+        """Like inflation_data.load_table_arrays, served from the store
+
+        Returns the column arrays, whether missing values were filled and
+        the dataset record.
+        """
+        dataset = self.import_file(path, name)
+        return self.query_years(dataset['id']), bool(dataset['has_missing']), dataset
+
+    # Unit results
+
+    def save_unit_result(self, unit):
+        """Keep a unit result by dataset content and window; failures are ignored"""
+        data = {year: offset for offset, year in enumerate(unit.years)}
+        rows = []
+        for year in range(unit.start_year, unit.end_year + 1):
+            offset = data.get(year)
+            if offset is None:
+                values = (None, None, None)
+            else:
+                values = (float(unit.inflation[offset]), float(unit.indexation[offset]),
+                          float(unit.coefficients[offset]))
+            rows.append((unit.content_hash, unit.start_year, unit.end_year, year,
+                         unit.yearly_pensions[year]) + values)
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO unit_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                       rows)
+        except sqlite3.Error as e:
+            # Only a cache: the calculation goes on without it
+            print(f"Unit result not stored: {e}")
+
+    def load_unit_result(self, content_hash, start_year, end_year):
+        """Stored unit result of a window, or None"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT year, pension, inflation, indexation, coefficient FROM unit_results "
+                    "WHERE content_hash = ? AND start_year = ? AND end_year = ? ORDER BY year",
+                    (content_hash, start_year, end_year)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Unit result not read from store: {e}")
+            return None
+        if len(rows) != end_year - start_year + 1:
+            return None
+        data_rows = [row for row in rows if row[2] is not None]
+        return compensation_engine.UnitResult.from_columns(
+            content_hash, start_year, end_year,
+            {row[0]: row[1] for row in rows},
+            [row[0] for row in data_rows],
+            [row[2] for row in data_rows],
+            [row[3] for row in data_rows],
+            [row[4] for row in data_rows]
+        )
+
+    def clear_results(self, content_hash=None):
+        """Delete stored unit results, of one dataset content or all"""
+        with self._lock, self._conn:
+            if content_hash is None:
+                self._conn.execute("DELETE FROM unit_results")
+            else:
+                self._conn.execute("DELETE FROM unit_results WHERE content_hash = ?", (content_hash,))
+
+
+def open_store(path=None, data_path=None):
+    """Open the store, or return None if it cannot be used"""
+    try:
+        return DataStore(path or default_store_path(data_path))
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Data store is not available: {e}")
+        return None
@@ -0,0 +1,329 @@
+"""Export of calculation results to files."""
+import bz2
+import gzip
+import lzma
+import os
+from datetime import datetime
+
+
+# Rows per worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+REPORT_HEADERS = [
+    'Year',
+    'Pension in January',
+    'Inflation (%)',
+    'Indexation (%)',
+    'Paid per year',
+    'Losses per month',
+    'Losses per year (compensation)',
+    'Loss percentage (%)',
+    'Accumulated losses'  # Changed name
+]
+
+# yearly_summary keys of report columns 2-9 with their decimals and cell format
+REPORT_COLUMNS = [
+    ('pension_in_january', 2, 'money'),
+    ('inflation_year', 2, 'percent'),
+    ('indexation_year', 1, 'percent_tenths'),  # Precision to tenths
+    ('sum_per_year', 2, 'money'),
+    ('compensation_per_month', 2, 'money'),  # Losses per month
+    ('compensation_per_year', 2, 'loss'),  # Losses per year (compensation)
+    ('loss_percentage', 2, 'percent'),
+    ('total_compensation', 2, 'money')  # Accumulated losses
+]
+
+DETAIL_HEADERS = ['Year', 'Month', 'Pension', 'Paid', 'Compensation']
+
+# Columnar export formats by file extension
+COLUMNAR_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow'
+}
+# CSV compression: file suffix and opener
+CSV_COMPRESSION = {
+    'gzip': ('.gz', gzip.open),
+    'bz2': ('.bz2', bz2.open),
+    'xz': ('.xz', lzma.open)
+}
+# Command-line help of the compression option of write_frames
+COMPRESSION_HELP = "gzip/bz2/xz for CSV, Parquet codec (default snappy), lz4/zstd for Arrow"
+
+
+def _no_progress(percent):
+    pass
+
+
+def _add_report_styles(wb):
+    """Register named styles shared by all cells of the report
+
+    Every body style has a plain and a striped ('_stripe') variant.
+    """
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.styles.fonts import DEFAULT_FONT
+
+    side = Side(style='thin')
+    border = Border(left=side, right=side, top=side, bottom=side)
+    stripe = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
+
+    def alignment(horizontal):
+        return Alignment(horizontal=horizontal, vertical="center")
+
+    wb.add_named_style(NamedStyle(
+        name='report_header',
+        fill=PatternFill(start_color="2d4a24", end_color="2d4a24", fill_type="solid"),
+        font=Font(color="FFFFFF", bold=True, size=12),
+        alignment=alignment("center"),
+        border=border
+    ))
+
+    body = {
+        'cell': {'alignment': alignment("center")},
+        'money': {'alignment': alignment("center"), 'number_format': '#,##0.00'},
+        'percent': {'alignment': alignment("center"), 'number_format': '0.00"%"'},
+        'percent_tenths': {'alignment': alignment("center"), 'number_format': '0.0"%"'},
+        'loss': {'alignment': alignment("center"), 'number_format': '#,##0.00',
+                 'font': Font(color="800000", bold=True)},
+        'label': {'alignment': alignment("left")},
+        'value': {'alignment': alignment("right")}
+    }
+    for name, attributes in body.items():
+        # Cells without own font keep the workbook's default one
+        attributes.setdefault('font', DEFAULT_FONT)
+        wb.add_named_style(NamedStyle(name=f'report_{name}', border=border, **attributes))
+        wb.add_named_style(NamedStyle(name=f'report_{name}_stripe', border=border, fill=stripe, **attributes))
+
+
+def _styled_row(ws, values, styles, striped=False):
+    """Row of write-only cells with the given report styles"""
+    from openpyxl.cell import WriteOnlyCell
+
+    suffix = '_stripe' if striped else ''
+    row = []
+    for value, style in zip(values, styles):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = f'report_{style}{suffix}'
+        row.append(cell)
+    return row
+
+
+def _create_sheet(wb, title, headers, widths, part=1):
+    """Write-only sheet with styled header; later parts get a numbered title"""
+    from openpyxl.utils import get_column_letter
+
+    ws = wb.create_sheet(title=title if part == 1 else f"{title} ({part})")
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.append(_styled_row(ws, headers, ['header'] * len(headers)))
+    return ws
+
+
+def write_excel_report(file_path, results, params, source_df, progress=_no_progress,
+                       include_details=False):
+    """Write results to Excel file with formatting
+
+    params holds start_year, end_year and pension_2025 of the calculation.
+    progress(percent) is called between stages; it may raise to abort the
+    export before the file is written. With include_details the monthly
+    records are added on a "Monthly Details" sheet, continued on further
+    sheets past the Excel row limit.
+
+    The workbook is written in a single streaming pass: rows are created
+    with shared named styles and are not kept in memory.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    _add_report_styles(wb)
+
+    # Sheet 1: Yearly summary
+    ws1 = _create_sheet(wb, "Yearly Summary", REPORT_HEADERS, [18] * len(REPORT_HEADERS))
+    summary_styles = ['cell'] + [style for _, _, style in REPORT_COLUMNS]
+    yearly_summary = results['yearly_summary']
+    for row_num, year in enumerate(sorted(yearly_summary.keys()), 2):
+        data = yearly_summary[year]
+        row_data = [year] + [round(data[key], decimals) for key, decimals, _ in REPORT_COLUMNS]
+        ws1.append(_styled_row(ws1, row_data, summary_styles, striped=row_num % 2 == 0))
+
+    progress(40)
+
+    # Sheet 2: Summary
+    loss_percentage = results['loss_percentage']
+    start_year = params['start_year']
+    end_year = params['end_year']
+    months_count = (end_year - start_year + 1) * 12
+
+    summary_data = [
+        ["Analysis start year", start_year],
+        ["Analysis end year", end_year],
+        [f"Pension amount in {end_year}", params['pension_2025']],
+        ["Total analysis months", months_count],
+        ["Total paid", round(results['total_paid'], 2)],
+        ["Total losses", round(results['total_compensation'], 2)],  # Changed
+        ["Loss percentage (%)", f"{loss_percentage:.2f}%"],
+        ["Average monthly losses",
+         round(results['total_compensation'] / months_count, 2)],
+        ["Calculation date", datetime.now().strftime("%d.%m.%Y %H:%M:%S")]
+    ]
+
+    ws2 = _create_sheet(wb, "Summary", ["Parameter", "Value"], [30, 20])
+    for row_num, row in enumerate(summary_data, 2):
+        ws2.append(_styled_row(ws2, row, ['label', 'value'], striped=row_num % 2 == 0))
+
+    progress(60)
+
+    # Sheet 3: Source data
+    source_headers = ['Year', 'Rosstat Inflation (%)', 'Pension Indexation (%)']
+    ws3 = _create_sheet(wb, "Source Data", source_headers, [20] * 3)
+    source_rows = zip(
+        source_df['year'].tolist(),
+        source_df['inflation_rosstat'].tolist(),
+        source_df['indexation'].tolist()  # Indexation to tenths
+    )
+    for row_num, row in enumerate(source_rows, 2):
+        ws3.append(_styled_row(ws3, row, ['cell', 'percent', 'percent_tenths'], striped=row_num % 2 == 0))
+
+    # Sheet 4: Monthly details
+    if include_details:
+        progress(70)
+        detail_styles = ['cell', 'cell', 'money', 'money', 'loss']
+        part = 1
+        ws4 = _create_sheet(wb, "Monthly Details", DETAIL_HEADERS, [12, 10, 18, 18, 18])
+        row_num = 2
+        columns = results['details'].columns
+        for row in zip(*(columns[key].tolist() for key in DETAIL_HEADERS)):
+            if row_num > EXCEL_MAX_ROWS:
+                part += 1
+                ws4 = _create_sheet(wb, "Monthly Details", DETAIL_HEADERS, [12, 10, 18, 18, 18], part)
+                row_num = 2
+            ws4.append(_styled_row(ws4, row, detail_styles, striped=row_num % 2 == 0))
+            row_num += 1
+
+    progress(90)
+    wb.save(file_path)
+    progress(100)
+
+
+def write_excel_table(file_path, chunks, sheet_title, columns, width=18):
+    """Stream DataFrame chunks to a write-only Excel workbook, return number of rows
+
+    Only the header row is styled so that a million rows are written
+    quickly; rows past the Excel limit continue on numbered sheets.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    _add_report_styles(wb)
+    part = 1
+    ws = _create_sheet(wb, sheet_title, columns, [width] * len(columns))
+    sheet_rows = 1
+    rows = 0
+    for chunk in chunks:
+        values = zip(*(chunk[column].tolist() for column in columns))
+        for row in values:
+            if sheet_rows == EXCEL_MAX_ROWS:
+                part += 1
+                ws = _create_sheet(wb, sheet_title, columns, [width] * len(columns), part)
+                sheet_rows = 1
+            ws.append(row)
+            sheet_rows += 1
+        rows += len(chunk)
+    wb.save(file_path)
+    return rows
+
+
+def columnar_format(path):
+    """Format of a columnar export file and the compression implied by its name
+
+    A compression suffix is recognised for CSV files, e.g. results.csv.gz.
+    """
+    name = path.lower()
+    compression = None
+    for method, (suffix, _) in CSV_COMPRESSION.items():
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            compression = method
+            break
+    extension = os.path.splitext(name)[1]
+    if extension not in COLUMNAR_FORMATS or (compression and COLUMNAR_FORMATS[extension] != 'csv'):
+        raise ValueError(f"Unsupported export file type: {os.path.basename(path)}")
+    return COLUMNAR_FORMATS[extension], compression
+
+
+def _arrow_table(chunk):
+    import pyarrow as pa
+
+    if isinstance(chunk, dict):
+        return pa.table(chunk)
+    return pa.Table.from_pandas(chunk, preserve_index=False)
+
+
+def write_frames(chunks, path, compression=None):
+    """Stream chunks to a CSV, Parquet or Arrow file, return number of rows
+
+    Chunks are DataFrames or dicts of equal-length arrays and are written
+    column by column, never as per-row records. compression is one of
+    gzip, bz2 or xz for CSV (implied by a .gz/.bz2/.xz suffix), a Parquet
+    codec (default snappy) or lz4/zstd for Arrow. Uncompressed Arrow files
+    can be memory-mapped by readers without copying. Parquet and Arrow
+    require pyarrow.
+    """
+    file_format, suffix_compression = columnar_format(path)
+    rows = 0
+
+    if file_format == 'csv':
+        import pandas as pd
+
+        compression = compression or suffix_compression
+        if compression is not None and compression not in CSV_COMPRESSION:
+            raise ValueError(f"Unsupported CSV compression: {compression}")
+        opener = CSV_COMPRESSION[compression][1] if compression else open
+        with opener(path, 'wt', newline='', encoding='utf-8') as f:
+            header = True
+            for chunk in chunks:
+                frame = pd.DataFrame(chunk) if isinstance(chunk, dict) else chunk
+                frame.to_csv(f, header=header, index=False)
+                header = False
+                rows += len(frame)
+        return rows
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = _arrow_table(chunk)
+            if writer is None:
+                if file_format == 'parquet':
+                    writer = pq.ParquetWriter(path, table.schema, compression=compression or 'snappy')
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression)
+                    writer = pa.ipc.new_file(path, table.schema, options=options)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_columns(path, columns, compression=None):
+    """Write a dict of equal-length arrays, e.g. summary_columns of a result"""
+    return write_frames([columns], path, compression)
+
+
+def write_result_columns(results, summary_path, details_path=None, compression=None,
+                         progress=_no_progress):
+    """Yearly summary and, optionally, monthly details of a calculation
+
+    Written from the result's summary_columns and details.columns arrays.
+    """
+    write_columns(summary_path, results['summary_columns'], compression)
+    progress(50)
+    if details_path is not None:
+        write_columns(details_path, results['details'].columns, compression)
+    progress(100)
@@ -0,0 +1,167 @@
+"""Loading and validation of the inflation data file without Qt.
+
+pandas is imported only when an Excel file has to be parsed, so loading an
+unchanged table from its binary sidecar stays cheap for scripts.
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import compensation_engine
+
+REQUIRED_COLUMNS = ['year', 'inflation_rosstat', 'indexation']
+
+# Validated table is cached next to the source file in this binary format
+SIDECAR_SUFFIX = '.cache.npz'
+SIDECAR_VERSION = 1
+
+
+class MissingColumnsError(ValueError):
+    """Data file lacks some of the required columns"""
+
+    def __init__(self, missing, found):
+        super().__init__(f"File missing columns: {', '.join(missing)}")
+        self.missing = missing
+        self.found = found
+
+
+def default_data_path():
+    """Path to data/russia_inflation.xlsx next to the program"""
+    if getattr(sys, 'frozen', False):
+        # If running as EXE - look next to EXE
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # If running as script - look next to script
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, 'data', 'russia_inflation.xlsx')
+
+
+def prepare_table(df):
+    """Check columns, convert types and fill gaps
+
+    Returns the prepared DataFrame and whether missing values were filled.
+    """
+    import pandas as pd
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise MissingColumnsError(missing_columns, df.columns.tolist())
+
+    df['year'] = df['year'].astype(int)
+    df['inflation_rosstat'] = pd.to_numeric(df['inflation_rosstat'], errors='coerce')
+    df['indexation'] = pd.to_numeric(df['indexation'], errors='coerce')
+
+    has_missing = bool(df.isnull().any().any())
+    if has_missing:
+        df = df.ffill()
+    return df, has_missing
+
+
+def read_inflation_table(path):
+    """Read inflation table from Excel file and prepare it"""
+    import pandas as pd
+
+    return prepare_table(pd.read_excel(path))
+
+
+def sidecar_path(path):
+    """Path of the binary cache for a data file"""
+    return path + SIDECAR_SUFFIX
+
+
+def file_hash(path):
+    """SHA-256 of file contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_sidecar(path, source_stat):
+    """Cached table arrays if the sidecar matches the source, else None"""
+    cache_path = sidecar_path(path)
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            meta = json.loads(str(cached['meta']))
+            arrays = {col: cached[col] for col in REQUIRED_COLUMNS}
+    except (OSError, KeyError, ValueError):
+        return None
+
+    if meta.get('version') != SIDECAR_VERSION:
+        return None
+    if meta['mtime_ns'] == source_stat.st_mtime_ns and meta['size'] == source_stat.st_size:
+        return arrays, meta
+    # Source touched but maybe not changed: compare contents
+    if meta['sha256'] == file_hash(path):
+        _write_sidecar(path, source_stat, meta['sha256'], arrays, meta['has_missing'])
+        return arrays, meta
+    return None
+
+
+def _write_sidecar(path, source_stat, digest, arrays, has_missing):
+    """Save validated table next to the source; failures are ignored"""
+    meta = {
+        'version': SIDECAR_VERSION,
+        'mtime_ns': source_stat.st_mtime_ns,
+        'size': source_stat.st_size,
+        'sha256': digest,
+        'has_missing': has_missing
+    }
+    cache_path = sidecar_path(path)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        # Replace atomically so concurrent readers never see a partial file
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_table_arrays(path, use_cache=True):
+    """Validated columns of the inflation table as NumPy arrays
+
+    Returns a dict of arrays keyed by REQUIRED_COLUMNS and whether missing
+    values were filled. The binary sidecar is used when the source file is
+    unchanged; it is keyed by the source's modification time, size and
+    SHA-256 of its contents.
+    """
+    source_stat = os.stat(path)
+    if use_cache:
+        cached = _read_sidecar(path, source_stat)
+        if cached is not None:
+            arrays, meta = cached
+            return arrays, meta['has_missing']
+
+    digest = file_hash(path)
+    df, has_missing = read_inflation_table(path)
+    arrays = {
+        'year': df['year'].to_numpy(dtype=np.int64),
+        'inflation_rosstat': df['inflation_rosstat'].to_numpy(dtype=float),
+        'indexation': df['indexation'].to_numpy(dtype=float)
+    }
+    _write_sidecar(path, source_stat, digest, arrays, has_missing)
+    return arrays, has_missing
+
+
+def load_inflation_table(path, use_cache=True):
+    """Read inflation table, using the binary sidecar when the source is unchanged
+
+    Returns the prepared DataFrame with the required columns and whether
+    missing values were filled.
+    """
+    import pandas as pd
+
+    arrays, has_missing = load_table_arrays(path, use_cache)
+    return pd.DataFrame(arrays, columns=REQUIRED_COLUMNS), has_missing
+
+
+def load_year_index(path, use_cache=True):
+    """YearIndex of a data file, without pandas when the sidecar is fresh"""
+    arrays, _ = load_table_arrays(path, use_cache)
+    return compensation_engine.YearIndex(arrays['year'], arrays['inflation_rosstat'], arrays['indexation'])
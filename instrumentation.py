@@ -0,0 +1,273 @@
+"""Opt-in timing, profiling and memory tracing of user actions.
+
+Enabled by the PENSION_INSTRUMENTATION environment variable or from the
+Tools menu. The variable is a comma-separated list of modes:
+    timing       stage timings (any non-empty value other than 0 enables it)
+    cprofile     cProfile statistics of the stages
+    tracemalloc  peak memory and top allocations of every action
+Each finished action is appended as one JSON line to the log file
+(PENSION_INSTRUMENTATION_LOG, default Result/instrumentation.jsonl) and
+reported to listeners, e.g. the status bar. Without Qt dependencies.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+ENV_VAR = 'PENSION_INSTRUMENTATION'
+LOG_ENV_VAR = 'PENSION_INSTRUMENTATION_LOG'
+DEFAULT_LOG_PATH = os.path.join('Result', 'instrumentation.jsonl')
+
+# Number of functions and allocation sites written to the log
+PROFILE_TOP = 15
+MEMORY_TOP = 10
+
+
+def _kb(size):
+    return round(size / 1024, 1)
+
+
+class ActionRecord:
+    """Timings of one user action, possibly spanning several threads"""
+
+    enabled = True
+
+    def __init__(self, instrumentation, name, fields):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.fields = fields
+        self.stages = {}
+        self.finished = False
+        self._profiles = []
+        self._unprofiled = []
+        self._lock = threading.Lock()
+        self._memory_before = instrumentation.start_memory_trace() if instrumentation.trace_memory else None
+        self._started = time.perf_counter()
+        self._timestamp = datetime.now()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a stage of the action; the same name accumulates
+
+        Only one profiler can run at a time, so a stage overlapping another
+        profiled stage (nested, or on another thread) is timed but not
+        profiled; a nested stage is covered by the profile of its parent.
+        """
+        profile = None
+        if self.instrumentation.profile_calls:
+            profile = self.instrumentation.start_profile()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            if profile is not None:
+                self.instrumentation.stop_profile(profile)
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+                if profile is not None:
+                    self._profiles.append(profile)
+                elif self.instrumentation.profile_calls and name not in self._unprofiled:
+                    self._unprofiled.append(name)
+
+    def finish(self, status='ok'):
+        """Log the action; later calls are ignored"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+
+        record = {
+            'time': self._timestamp.isoformat(timespec='milliseconds'),
+            'action': self.name,
+            'status': status,
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'stages_ms': {name: round(ms, 3) for name, ms in self.stages.items()}
+        }
+        record.update(self.fields)
+        if self._profiles:
+            record['profile'] = self._profile_summary()
+        if self._memory_before is not None:
+            record['memory'] = self.instrumentation.stop_memory_trace(self._memory_before)
+        self.instrumentation.report(record)
+
+    def _profile_summary(self):
+        """Top functions by cumulative time; full statistics go to a .prof file"""
+        stats = pstats.Stats(self._profiles[0], stream=io.StringIO())
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        stats.sort_stats('cumulative')
+
+        top = []
+        for func in stats.fcn_list[:PROFILE_TOP]:
+            calls, _, total_time, cumulative_time, _ = stats.stats[func]
+            filename, line, function = func
+            top.append({
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'tottime_ms': round(total_time * 1000, 3),
+                'cumtime_ms': round(cumulative_time * 1000, 3)
+            })
+
+        summary = {'top': top}
+        if self._unprofiled:
+            summary['unprofiled_stages'] = self._unprofiled
+        log_dir = os.path.dirname(self.instrumentation.log_path) or '.'
+        prof_path = os.path.join(log_dir, f"{self.name}_{self._timestamp.strftime('%Y%m%d_%H%M%S_%f')}.prof")
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            stats.dump_stats(prof_path)
+            summary['file'] = prof_path
+        except OSError:
+            pass
+        return summary
+
+
+class _DisabledAction:
+    """Stand-in record when instrumentation is off"""
+
+    enabled = False
+    name = None
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def finish(self, status='ok'):
+        pass
+
+
+DISABLED_ACTION = _DisabledAction()
+
+
+class Instrumentation:
+    """Creates action records and writes finished ones to the log"""
+
+    def __init__(self, timing=False, profile_calls=False, trace_memory=False, log_path=DEFAULT_LOG_PATH):
+        self.timing = timing
+        self.profile_calls = profile_calls
+        self.trace_memory = trace_memory
+        self.log_path = log_path
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._memory_users = 0
+        self._started_tracing = False
+        self._profiling = False
+
+    @classmethod
+    def from_environment(cls, environ=os.environ):
+        """Settings from PENSION_INSTRUMENTATION and PENSION_INSTRUMENTATION_LOG"""
+        value = environ.get(ENV_VAR, '').strip().lower()
+        modes = {mode.strip() for mode in value.split(',') if mode.strip()}
+        return cls(
+            timing=bool(modes - {'0'}),
+            profile_calls='cprofile' in modes,
+            trace_memory='tracemalloc' in modes,
+            log_path=environ.get(LOG_ENV_VAR) or DEFAULT_LOG_PATH
+        )
+
+    @property
+    def enabled(self):
+        return self.timing or self.profile_calls or self.trace_memory
+
+    def action(self, name, **fields):
+        """Start recording an action; finish() must be called on the result"""
+        if not self.enabled:
+            return DISABLED_ACTION
+        return ActionRecord(self, name, fields)
+
+    @contextlib.contextmanager
+    def measure(self, name, **fields):
+        """Record an action that runs inside the with block"""
+        action = self.action(name, **fields)
+        try:
+            yield action
+        except BaseException:
+            action.finish('error')
+            raise
+        action.finish()
+
+    def start_profile(self):
+        """Enabled cProfile profiler, or None if a profiler is already running"""
+        with self._lock:
+            if self._profiling:
+                return None
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiling tool is active (Python 3.12+)
+                return None
+            self._profiling = True
+            return profile
+
+    def stop_profile(self, profile):
+        with self._lock:
+            profile.disable()
+            self._profiling = False
+
+    def start_memory_trace(self):
+        """Begin tracing allocations for an action; returns start snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._memory_users += 1
+            tracemalloc.reset_peak()
+            return tracemalloc.take_snapshot()
+
+    def stop_memory_trace(self, before):
+        """Peak memory and top allocation sites since the start snapshot"""
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            self._memory_users -= 1
+            if self._memory_users == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        differences = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        top = []
+        for diff in differences[:MEMORY_TOP]:
+            frame = diff.traceback[0]
+            top.append({
+                'location': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                'size_diff_kb': _kb(diff.size_diff),
+                'count_diff': diff.count_diff
+            })
+        return {'current_kb': _kb(current), 'peak_kb': _kb(peak), 'top': top}
+
+    def report(self, record):
+        """Append record to the JSON-lines log and notify listeners"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            try:
+                log_dir = os.path.dirname(self.log_path)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError:
+                # Diagnostics must never break the application
+                pass
+        for listener in self.listeners:
+            listener(record)
+
+
+def format_record(record):
+    """Short one-line description of an action record"""
+    stages = ', '.join(f"{name} {ms:.1f}" for name, ms in record['stages_ms'].items())
+    text = f"{record['action']}: {record['total_ms']:.1f} ms"
+    if stages:
+        text += f" ({stages})"
+    if record['status'] != 'ok':
+        text += f" [{record['status']}]"
+    if 'memory' in record:
+        text += f" | peak {record['memory']['peak_kb'] / 1024:.1f} MB"
+    return text
@@ -1,22 +1,78 @@
 import sys
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
 from PyQt5.QtWidgets import *
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QFont
 import os
+import sqlite3
+from collections import OrderedDict
 from datetime import datetime
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import compensation_engine
+import data_store
+from chart import CompensationChart, SweepHeatmap
+import exporters
+import inflation_data
+import instrumentation
+from results_model import SummaryTableModel
+from source_data_model import SourceDataModel
+from workers import Task
+
+# Pause after the last input change before results are recalculated
+LIVE_UPDATE_DELAY_MS = 150
+
+# Number of rendered methodology reports kept
+METHODOLOGY_CACHE_SIZE = 16
+
+# Columnar export formats: combo box text and file extension
+DATA_EXPORT_FORMATS = {'CSV': '.csv', 'Parquet': '.parquet', 'Arrow': '.arrow'}
+
+# Default pension amounts of the parameter sweep (RUB)
+SWEEP_PENSIONS = "10000, 15000, 20000, 25000, 30000, 40000, 50000"
+# Parameter sweep metrics: combo box text, grid key and value format
+SWEEP_METRICS = {
+    'Total losses (RUB)': ('total_compensation', lambda value: f"{value:,.0f} RUB".replace(',', ' ')),
+    'Loss percentage (%)': ('loss_percentage', lambda value: f"{value:.2f}%"),
+    'Total paid (RUB)': ('total_paid', lambda value: f"{value:,.0f} RUB".replace(',', ' '))
+}
+SWEEP_VIEWS = ["Start year × end year", "Start year × pension"]
 
 
 class PensionLagAnalyzer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.df = None
+        self.year_index = None
+        # Versioned datasets and unit results kept between sessions
+        self.store = data_store.open_store(data_path=inflation_data.default_data_path())
+        self.dataset = None
+        # Other datasets shown next to the results: name -> YearIndex
+        self.comparison = OrderedDict()
+        self.comparison_result = None
+        self.result_cache = compensation_engine.ResultCache(store=self.store)
+        self.window_table = None
         self.results = None
+        self.calc_params = None
+        # Data index the shown results were calculated with
+        self.results_index = None
+        # Shown results were calculated from data edited since
+        self.results_stale = False
+        self.thread_pool = QThreadPool()
+        self.current_task = None
+        self.current_action = instrumentation.DISABLED_ACTION
+        # Rendered methodology reports by dataset and calculation parameters
+        self.methodology_html = OrderedDict()
+        self.methodology_shown = None
+        # Loss grid of the parameter sweep, calculated when its tab is shown
+        self.sweep = None
+        self.instrumentation = instrumentation.Instrumentation.from_environment()
+        self.instrumentation.listeners.append(self.show_action_timing)
+        # Debounced recalculation after input changes
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_UPDATE_DELAY_MS)
+        self.live_timer.timeout.connect(self.live_recalculate)
         self.init_ui()
         self.load_data()
 
@@ -48,6 +104,41 @@ class PensionLagAnalyzer(QMainWindow):
         self.setup_method_tab(method_tab)
         self.tab_widget.addTab(method_tab, "Methodology")
 
+        # Third tab: Parameter sweep heatmap
+        sweep_tab = QWidget()
+        self.setup_sweep_tab(sweep_tab)
+        self.tab_widget.addTab(sweep_tab, "Parameter Sweep")
+
+        # Fourth tab: Editable source data
+        data_tab = QWidget()
+        self.setup_data_tab(data_tab)
+        self.tab_widget.addTab(data_tab, "Source Data")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+
+        self.setup_tools_menu()
+
+    def setup_tools_menu(self):
+        """Menu with instrumentation switches"""
+        menu = self.menuBar().addMenu("Tools")
+        options = [
+            ("Time operations", 'timing'),
+            ("Profile operations (cProfile)", 'profile_calls'),
+            ("Trace memory allocations", 'trace_memory')
+        ]
+        for title, attribute in options:
+            action = menu.addAction(title)
+            action.setCheckable(True)
+            action.setChecked(getattr(self.instrumentation, attribute))
+            action.toggled.connect(
+                lambda checked, attribute=attribute: setattr(self.instrumentation, attribute, checked)
+            )
+        menu.addSeparator()
+        menu.addAction(f"Log: {self.instrumentation.log_path}").setEnabled(False)
+
+    def show_action_timing(self, record):
+        """Show timings of a finished action in the status bar"""
+        self.statusBar().showMessage(instrumentation.format_record(record))
+
     def setup_main_tab(self, tab):
         """Setup main tab"""
         main_widget = QWidget()
@@ -64,17 +155,23 @@ class PensionLagAnalyzer(QMainWindow):
         table_label.setStyleSheet("padding: 8px; color: #000000;")  # Black color
         left_layout.addWidget(table_label)
 
-        self.table = QTableWidget()
+        self.table_model = SummaryTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         self.table.setFont(QFont("Arial", 10))
         self.table.horizontalHeader().setFont(QFont("Arial", 10, QFont.Bold))
         self.table.setAlternatingRowColors(True)
+        # All columns are stretchable
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         # Stretch the table to full width
         left_layout.addWidget(self.table, stretch=4)
 
-        # Chart
-        self.figure = Figure(figsize=(8, 5.5))
-        self.canvas = FigureCanvas(self.figure)
-        left_layout.addWidget(self.canvas, stretch=5)
+        # Chart (matplotlib is loaded when the first chart is drawn)
+        self.chart = None
+        self.chart_area = QWidget()
+        self.chart_layout = QVBoxLayout(self.chart_area)
+        self.chart_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addWidget(self.chart_area, stretch=5)
 
         main_layout.addWidget(left_panel, 68)
 
@@ -97,12 +194,14 @@ class PensionLagAnalyzer(QMainWindow):
         params_layout.setSpacing(8)
 
         # Current pension
-        pension_label = QLabel("Pension amount in 2025 (RUB):")
-        pension_label.setFont(QFont("Arial", 11))
-        params_layout.addWidget(pension_label)
+        self.pension_label = QLabel("Pension amount in 2025 (RUB):")
+        self.pension_label.setFont(QFont("Arial", 11))
+        params_layout.addWidget(self.pension_label)
         self.pension_input = QLineEdit("25000")
         self.pension_input.setFont(QFont("Arial", 11))
         self.pension_input.setToolTip("Enter pension amount in rubles for 2025")
+        self.pension_input.textChanged.connect(self.update_window_preview)
+        self.pension_input.textChanged.connect(self.schedule_live_update)
         params_layout.addWidget(self.pension_input)
 
         # Start year
@@ -111,16 +210,18 @@ class PensionLagAnalyzer(QMainWindow):
         params_layout.addWidget(start_label)
         self.start_year = QComboBox()
         self.start_year.setFont(QFont("Arial", 11))
+        self.start_year.currentTextChanged.connect(self.update_window_preview)
+        self.start_year.currentTextChanged.connect(self.schedule_live_update)
         params_layout.addWidget(self.start_year)
 
-        # End year (fixed at 2025)
+        # End year
         end_label = QLabel("Analysis end year:")
         end_label.setFont(QFont("Arial", 11))
         params_layout.addWidget(end_label)
-        self.end_year = QLabel("2025")
+        self.end_year = QComboBox()
         self.end_year.setFont(QFont("Arial", 11, QFont.Bold))
-        self.end_year.setStyleSheet(
-            "color: #000000; padding: 5px; border: 1px solid #ccc; border-radius: 3px; background-color: #f0f0f0;")  # Black color
+        self.end_year.currentTextChanged.connect(self.on_end_year_changed)
+        self.end_year.currentTextChanged.connect(self.schedule_live_update)
         params_layout.addWidget(self.end_year)
 
         # Calculation info
@@ -135,6 +236,31 @@ class PensionLagAnalyzer(QMainWindow):
         params.setLayout(params_layout)
         right_layout.addWidget(params)
 
+        # Other datasets calculated with the same parameters
+        comparison_group = QGroupBox("Comparison Datasets")
+        comparison_group.setFont(QFont("Arial", 11, QFont.Bold))
+        comparison_layout = QVBoxLayout()
+
+        self.comparison_label = QLabel("Add data files of regions, other inflation measures or countries")
+        self.comparison_label.setFont(QFont("Arial", 10))
+        self.comparison_label.setStyleSheet("color: #666666;")
+        self.comparison_label.setWordWrap(True)
+        comparison_layout.addWidget(self.comparison_label)
+
+        comparison_buttons = QHBoxLayout()
+        self.add_datasets_btn = QPushButton("Add Datasets...")
+        self.add_datasets_btn.setFont(QFont("Arial", 10))
+        self.add_datasets_btn.clicked.connect(self.add_comparison_datasets)
+        comparison_buttons.addWidget(self.add_datasets_btn)
+        clear_datasets_btn = QPushButton("Clear")
+        clear_datasets_btn.setFont(QFont("Arial", 10))
+        clear_datasets_btn.clicked.connect(self.clear_comparison)
+        comparison_buttons.addWidget(clear_datasets_btn)
+        comparison_layout.addLayout(comparison_buttons)
+
+        comparison_group.setLayout(comparison_layout)
+        right_layout.addWidget(comparison_group)
+
         # Results (order changed)
         results_group = QGroupBox("Calculation Results")
         results_group.setFont(QFont("Arial", 11, QFont.Bold))
@@ -171,10 +297,10 @@ class PensionLagAnalyzer(QMainWindow):
         # Buttons
         buttons_vertical = QVBoxLayout()
 
-        calc_btn = QPushButton("Calculate Compensation")
-        calc_btn.setFont(QFont("Arial", 11))
-        calc_btn.setFixedHeight(40)
-        calc_btn.setStyleSheet("""
+        self.calc_btn = QPushButton("Calculate Compensation")
+        self.calc_btn.setFont(QFont("Arial", 11))
+        self.calc_btn.setFixedHeight(40)
+        self.calc_btn.setStyleSheet("""
             QPushButton {
                 background-color: #243e4a;
                 color: white;
@@ -185,8 +311,8 @@ class PensionLagAnalyzer(QMainWindow):
                 background-color: #1a2d36;
             }
         """)
-        calc_btn.clicked.connect(self.calculate)
-        buttons_vertical.addWidget(calc_btn)
+        self.calc_btn.clicked.connect(self.calculate)
+        buttons_vertical.addWidget(self.calc_btn)
 
         method_btn = QPushButton("Show Methodology")
         method_btn.setFont(QFont("Arial", 11))
@@ -223,6 +349,37 @@ class PensionLagAnalyzer(QMainWindow):
         self.export_excel_btn.setEnabled(False)
         buttons_vertical.addWidget(self.export_excel_btn)
 
+        self.export_details_check = QCheckBox("Include monthly details in export")
+        self.export_details_check.setFont(QFont("Arial", 10))
+        buttons_vertical.addWidget(self.export_details_check)
+
+        # Columnar export of the same data for analysis tools
+        data_export_layout = QHBoxLayout()
+        self.data_format = QComboBox()
+        self.data_format.setFont(QFont("Arial", 11))
+        self.data_format.addItems(list(DATA_EXPORT_FORMATS))
+        data_export_layout.addWidget(self.data_format)
+
+        self.export_data_btn = QPushButton("Export Data")
+        self.export_data_btn.setFont(QFont("Arial", 11))
+        self.export_data_btn.setFixedHeight(40)
+        self.export_data_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #243e4a;
+                color: white;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #1a2d36;
+            }
+        """)
+        self.export_data_btn.setToolTip("Yearly summary (and monthly details) as CSV, Parquet or Arrow file")
+        self.export_data_btn.clicked.connect(self.export_data)
+        self.export_data_btn.setEnabled(False)
+        data_export_layout.addWidget(self.export_data_btn, 1)
+        buttons_vertical.addLayout(data_export_layout)
+
         exit_btn = QPushButton("Exit")
         exit_btn.setFont(QFont("Arial", 11))
         exit_btn.setFixedHeight(40)
@@ -240,6 +397,19 @@ class PensionLagAnalyzer(QMainWindow):
         exit_btn.clicked.connect(self.close)
         buttons_vertical.addWidget(exit_btn)
 
+        # Progress of background tasks (hidden when idle)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        buttons_vertical.addWidget(self.progress_bar)
+
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setFont(QFont("Arial", 11))
+        self.cancel_btn.setFixedHeight(30)
+        self.cancel_btn.clicked.connect(self.cancel_task)
+        self.cancel_btn.setVisible(False)
+        buttons_vertical.addWidget(self.cancel_btn)
+
         right_layout.addLayout(buttons_vertical)
         right_layout.addStretch()
 
@@ -291,11 +461,269 @@ class PensionLagAnalyzer(QMainWindow):
         refresh_btn.clicked.connect(self.update_methodology)
         layout.addWidget(refresh_btn)
 
+    def setup_sweep_tab(self, tab):
+        """Setup parameter sweep tab"""
+        layout = QVBoxLayout(tab)
+
+        title_label = QLabel("Losses for Every Start Year, End Year and Pension Amount")
+        title_label.setFont(QFont("Arial", 16, QFont.Bold))
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setStyleSheet(
+            "color: #000000; padding: 15px; background-color: #f0f7f0; border-radius: 8px;")
+        layout.addWidget(title_label)
+
+        controls = QHBoxLayout()
+        pensions_label = QLabel("Pension amounts in the end year (RUB):")
+        pensions_label.setFont(QFont("Arial", 11))
+        controls.addWidget(pensions_label)
+        self.sweep_pensions = QLineEdit(SWEEP_PENSIONS)
+        self.sweep_pensions.setFont(QFont("Arial", 11))
+        self.sweep_pensions.setToolTip("Pension amounts separated by commas")
+        self.sweep_pensions.returnPressed.connect(self.run_sweep)
+        controls.addWidget(self.sweep_pensions, 1)
+
+        self.sweep_metric = QComboBox()
+        self.sweep_metric.setFont(QFont("Arial", 11))
+        self.sweep_metric.addItems(list(SWEEP_METRICS))
+        self.sweep_metric.currentIndexChanged.connect(self.show_sweep)
+        controls.addWidget(self.sweep_metric)
+
+        self.sweep_view = QComboBox()
+        self.sweep_view.setFont(QFont("Arial", 11))
+        self.sweep_view.addItems(SWEEP_VIEWS)
+        self.sweep_view.currentIndexChanged.connect(self.on_sweep_view_changed)
+        controls.addWidget(self.sweep_view)
+
+        self.sweep_fixed_label = QLabel()
+        self.sweep_fixed_label.setFont(QFont("Arial", 11))
+        controls.addWidget(self.sweep_fixed_label)
+        self.sweep_fixed = QComboBox()
+        self.sweep_fixed.setFont(QFont("Arial", 11))
+        self.sweep_fixed.currentIndexChanged.connect(self.show_sweep)
+        controls.addWidget(self.sweep_fixed)
+
+        sweep_btn = QPushButton("Run Sweep")
+        sweep_btn.setFont(QFont("Arial", 11))
+        sweep_btn.setFixedHeight(40)
+        sweep_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #243e4a;
+                color: white;
+                border-radius: 5px;
+                font-weight: bold;
+                padding: 0 15px;
+            }
+            QPushButton:hover {
+                background-color: #1a2d36;
+            }
+        """)
+        sweep_btn.clicked.connect(self.run_sweep)
+        controls.addWidget(sweep_btn)
+        layout.addLayout(controls)
+
+        hint_label = QLabel(
+            "All combinations are calculated at once. Hover over a cell to see its parameters and value; "
+            "cells with the start year not before the end year are empty.")
+        hint_label.setFont(QFont("Arial", 10))
+        hint_label.setStyleSheet("color: #666666; font-style: italic; padding: 5px;")
+        hint_label.setWordWrap(True)
+        layout.addWidget(hint_label)
+
+        # Heatmap (matplotlib is loaded when the sweep is first shown)
+        self.heatmap = None
+        self.heatmap_area = QWidget()
+        self.heatmap_layout = QVBoxLayout(self.heatmap_area)
+        self.heatmap_layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.heatmap_area, 1)
+
+    def setup_data_tab(self, tab):
+        """Setup source data tab"""
+        layout = QVBoxLayout(tab)
+
+        title_label = QLabel("Inflation and Pension Indexation Data")
+        title_label.setFont(QFont("Arial", 16, QFont.Bold))
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setStyleSheet(
+            "color: #000000; padding: 15px; background-color: #f0f7f0; border-radius: 8px;")
+        layout.addWidget(title_label)
+
+        hint_label = QLabel(
+            "Double-click an inflation or indexation value to change it. Results are updated at once; "
+            "the data file is not modified.")
+        hint_label.setFont(QFont("Arial", 10))
+        hint_label.setStyleSheet("color: #666666; font-style: italic; padding: 5px;")
+        hint_label.setWordWrap(True)
+        layout.addWidget(hint_label)
+
+        self.data_model = SourceDataModel(self)
+        self.data_model.valueEdited.connect(self.on_data_edited)
+        self.data_table = QTableView()
+        self.data_table.setModel(self.data_model)
+        self.data_table.setFont(QFont("Arial", 10))
+        self.data_table.horizontalHeader().setFont(QFont("Arial", 10, QFont.Bold))
+        self.data_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.data_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.data_table, 1)
+
+        reload_btn = QPushButton("Reload Data File")
+        reload_btn.setFont(QFont("Arial", 11))
+        reload_btn.setFixedHeight(40)
+        reload_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #243e4a;
+                color: white;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #1a2d36;
+            }
+        """)
+        reload_btn.setToolTip("Discard edits and read the data file again")
+        reload_btn.clicked.connect(self.reload_data)
+
+        save_version_btn = QPushButton("Save as New Version")
+        save_version_btn.setFont(QFont("Arial", 11))
+        save_version_btn.setFixedHeight(40)
+        save_version_btn.setStyleSheet(reload_btn.styleSheet())
+        save_version_btn.setToolTip("Keep the edited table as a new dataset version in the data store")
+        save_version_btn.clicked.connect(self.save_data_version)
+        save_version_btn.setEnabled(self.store is not None)
+
+        data_buttons = QHBoxLayout()
+        data_buttons.addWidget(reload_btn)
+        data_buttons.addWidget(save_version_btn)
+        layout.addLayout(data_buttons)
+
+    def on_data_edited(self, year, column, value):
+        """Apply an edited inflation or indexation value
+
+        Only values depending on the edited year are recomputed, and cached
+        results of windows that do not contain the year are kept.
+        """
+        with self.instrumentation.measure('edit_data', year=year, column=column) as action:
+            old_index = self.year_index
+            with action.stage('index'):
+                self.year_index = old_index.with_values(year, **{column: value})
+                self.window_table = self.window_table.updated(self.year_index, year)
+                self.result_cache.migrate(old_index, self.year_index, [year])
+
+            df_column = 'inflation_rosstat' if column == 'inflation' else 'indexation'
+            self.df.loc[self.df['year'] == year, df_column] = value
+
+            with action.stage('results'):
+                self.invalidate_sweep()
+                self.update_window_preview()
+                if self.calc_params is not None and \
+                        self.calc_params['start_year'] <= year <= self.calc_params['end_year']:
+                    self.results_stale = True
+                    self.live_recalculate()
+
+    def reload_data(self):
+        """Discard edits of the source data"""
+        self.load_data()
+        if self.results is not None:
+            self.results_stale = True
+            self.live_recalculate()
+
     def show_methodology(self):
         """Switch to methodology tab"""
         self.tab_widget.setCurrentIndex(1)
         self.update_methodology()
 
+    def on_tab_changed(self, index):
+        """Show methodology of the current result or the sweep when their tab is opened"""
+        if index == 1:
+            self.update_methodology()
+        elif index == 2 and self.sweep is None:
+            self.run_sweep()
+
+    def run_sweep(self):
+        """Calculate the loss grid for all start years, end years and pension amounts"""
+        if self.window_table is None or len(self.year_index) < 2:
+            return
+        try:
+            pensions = sorted({float(value) for value in self.sweep_pensions.text().replace(';', ',').split(',')
+                               if value.strip()})
+            if not pensions or pensions[0] <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Enter positive pension amounts separated by commas")
+            return
+
+        with self.instrumentation.measure('sweep', pensions=len(pensions), years=len(self.year_index)) as action:
+            with action.stage('compute'):
+                years = self.year_index.years
+                self.sweep = compensation_engine.calculate_compensation_sweep(
+                    self.year_index, pensions, years[:-1], years[1:], self.window_table
+                )
+            with action.stage('plot'):
+                self.on_sweep_view_changed()
+
+    def invalidate_sweep(self):
+        """Drop the sweep after a data change; recalculate it if shown"""
+        self.sweep = None
+        if self.tab_widget.currentIndex() == 2:
+            self.run_sweep()
+
+    def on_sweep_view_changed(self, *args):
+        """Fill the list of the fixed parameter of the selected view and show it"""
+        if self.sweep is None:
+            return
+        if self.sweep_view.currentIndex() == 0:
+            self.sweep_fixed_label.setText("Pension (RUB):")
+            items = [f"{value:,.0f}".replace(',', ' ') for value in self.sweep['pensions_2025'].tolist()]
+            try:
+                preferred = f"{float(self.pension_input.text()):,.0f}".replace(',', ' ')
+            except ValueError:
+                preferred = None
+        else:
+            self.sweep_fixed_label.setText("End year:")
+            items = [str(year) for year in self.sweep['end_years'].tolist()]
+            preferred = self.end_year.currentText()
+
+        # Keep the current choice, else follow the main tab's parameters
+        current = self.sweep_fixed.currentText()
+        self.sweep_fixed.blockSignals(True)
+        self.sweep_fixed.clear()
+        self.sweep_fixed.addItems(items)
+        for choice in (current, preferred, items[-1]):
+            if choice in items:
+                self.sweep_fixed.setCurrentText(choice)
+                break
+        self.sweep_fixed.blockSignals(False)
+        self.show_sweep()
+
+    def show_sweep(self, *args):
+        """Show the selected metric of the sweep as a heatmap"""
+        if self.sweep is None or self.sweep_fixed.currentIndex() < 0:
+            return
+        metric = self.sweep_metric.currentText()
+        key, value_format = SWEEP_METRICS[metric]
+        fixed = self.sweep_fixed.currentIndex()
+        if self.sweep_view.currentIndex() == 0:
+            values = self.sweep[key][fixed]
+            columns = self.sweep['end_years'].tolist()
+            column_title = "End year"
+        else:
+            values = self.sweep[key][:, :, fixed].T
+            columns = [f"{value:,.0f}".replace(',', ' ') for value in self.sweep['pensions_2025'].tolist()]
+            column_title = "Pension in the end year (RUB)"
+        self.ensure_heatmap().update(values, self.sweep['start_years'].tolist(), columns, "Start year",
+                                     column_title, metric, value_format)
+
+    def ensure_heatmap(self):
+        """Create sweep heatmap on first use"""
+        if self.heatmap is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+
+            self.heatmap_figure = Figure(figsize=(8, 5.5))
+            self.heatmap_canvas = FigureCanvas(self.heatmap_figure)
+            self.heatmap = SweepHeatmap(self.heatmap_figure, self.heatmap_canvas)
+            self.heatmap_layout.addWidget(self.heatmap_canvas)
+        return self.heatmap
+
     def update_methodology(self):
         """Update methodology information"""
         if self.results is None:
@@ -307,104 +735,45 @@ class PensionLagAnalyzer(QMainWindow):
             """)
             return
 
-        try:
-            pension_2025 = float(self.pension_input.text())
-            start_year = int(self.start_year.currentText())
-            end_year = 2025
+        # Report of the shown result is already displayed
+        unit = self.results['unit_result']
+        key = (unit.content_hash, unit.start_year, unit.end_year, self.results['pension_2025'])
+        if key == self.methodology_shown:
+            return
 
-            # Get data for methodology
-            method_data = self.get_methodology_data(pension_2025, start_year, end_year)
+        with self.instrumentation.measure('update_methodology') as action:
+            try:
+                html_report = self.methodology_html.get(key)
+                if html_report is None:
+                    # Methodology is derived from the stored result, not recalculated
+                    with action.stage('methodology_data'):
+                        method_data = self.get_methodology_data(self.results)
+
+                    # Create HTML methodology report with CONTRAST FONT
+                    with action.stage('html_report'):
+                        html_report = self.create_methodology_html_report(method_data)
+                    self.methodology_html[key] = html_report
+                    if len(self.methodology_html) > METHODOLOGY_CACHE_SIZE:
+                        self.methodology_html.popitem(last=False)
+                else:
+                    self.methodology_html.move_to_end(key)
 
-            # Create HTML methodology report with CONTRAST FONT
-            html_report = self.create_methodology_html_report(method_data)
-            self.method_text.setHtml(html_report)
+                with action.stage('set_html'):
+                    self.method_text.setHtml(html_report)
+                self.methodology_shown = key
 
-        except Exception as e:
-            self.method_text.setHtml(f"""
-                <div style='color: red; padding: 20px;'>
-                    <h3>Error forming methodology</h3>
-                    <p><b>Error:</b> {str(e)}</p>
-                </div>
-            """)
+            except Exception as e:
+                self.methodology_shown = None
+                self.method_text.setHtml(f"""
+                    <div style='color: red; padding: 20px;'>
+                        <h3>Error forming methodology</h3>
+                        <p><b>Error:</b> {str(e)}</p>
+                    </div>
+                """)
 
-    def get_methodology_data(self, pension_2025, start_year, end_year):
-        """Get data for methodology"""
-        if self.df is None or self.df.empty:
-            raise ValueError("No data for analysis")
-
-        # Restore pensions by year
-        yearly_pensions = {}
-        current_pension = pension_2025
-        yearly_pensions[end_year] = current_pension
-
-        for year in range(end_year - 1, start_year - 1, -1):
-            next_year_data = self.df[self.df['year'] == year + 1]
-            if not next_year_data.empty:
-                next_row = next_year_data.iloc[0]
-                indexation_rate = next_row['indexation'] / 100
-                current_pension = current_pension / (1 + indexation_rate)
-            yearly_pensions[year] = current_pension
-
-        # Select last 3 years for detailed analysis
-        analysis_years = list(range(max(start_year, end_year - 2), end_year + 1))
-
-        method_data = {
-            'pension_2025': pension_2025,
-            'start_year': start_year,
-            'end_year': end_year,
-            'yearly_pensions': yearly_pensions,
-            'analysis_years': analysis_years,
-            'compensation_details': [],
-            'total_compensation': 0.0
-        }
-
-        # Calculation for each analysis year
-        for year in analysis_years:
-            if year not in yearly_pensions:
-                continue
-
-            year_data = self.df[self.df['year'] == year]
-            if year_data.empty:
-                continue
-
-            row = year_data.iloc[0]
-            inflation_rate = row['inflation_rosstat'] / 100
-            pension = yearly_pensions[year]
-
-            # Exact calculation using formula
-            monthly_inflation = (1 + inflation_rate) ** (1 / 12) - 1
-
-            # Calculate series sum (formula from code)
-            series_sum = 0.0
-            monthly_details = []
-            for month in range(1, 13):
-                price_growth = (1 + monthly_inflation) ** month
-                monthly_compensation = pension * (1 - 1 / price_growth)
-                series_sum += (1 - 1 / price_growth)
-                monthly_details.append({
-                    'month': month,
-                    'price_growth': price_growth,
-                    'monthly_compensation': monthly_compensation
-                })
-
-            # Total compensation for the year
-            year_compensation = pension * series_sum
-
-            method_data['compensation_details'].append({
-                'year': year,
-                'pension': pension,
-                'inflation_rate': inflation_rate * 100,
-                'monthly_inflation': monthly_inflation * 100,
-                'series_sum': series_sum,
-                'compensation': year_compensation,
-                'avg_monthly': year_compensation / 12,
-                'monthly_details': monthly_details,
-                'percentage_of_pension': (year_compensation / (pension * 12)) * 100
-            })
-
-            method_data['total_compensation'] += year_compensation
-
-        return method_data
+    def get_methodology_data(self, results):
+        """Get data for methodology of a calculation result"""
+        return compensation_engine.methodology_data(results)
 
     def create_methodology_html_report(self, method_data):
         """Create HTML methodology report"""
@@ -675,99 +1044,132 @@ class PensionLagAnalyzer(QMainWindow):
 
     def load_data(self):
         """Load data ONLY from file"""
-        try:
-            # Determine where to look for file
-            if getattr(sys, 'frozen', False):
-                # If running as EXE - look next to EXE
-                base_path = os.path.dirname(sys.executable)
-            else:
-                # If running as script - look next to script
-                base_path = os.path.dirname(__file__)
-
-            # Path to Excel file
-            excel_path = os.path.join(base_path, 'data', 'russia_inflation.xlsx')
-
-            if os.path.exists(excel_path):
-                self.df = pd.read_excel(excel_path)
-                print(f"Data loaded from Excel: {excel_path}")
-            else:
-                # File not found - show error
-                error_msg = (
-                    "Data file not found!\n\n"
-                    f"Expected path: {excel_path}\n\n"
-                    "File 'russia_inflation.xlsx' required for program operation\n"
-                    "in folder 'data' next to the program.\n\n"
-                    "File structure:\n"
-                    "- year (year)\n"
-                    "- inflation_rosstat (inflation in %)\n"
-                    "- indexation (indexation in %)"
-                )
-                QMessageBox.critical(self, "Data Loading Error", error_msg)
+        import pandas as pd
+
+        with self.instrumentation.measure('load_data') as action:
+            try:
+                # Path to Excel file next to the program
+                excel_path = inflation_data.default_data_path()
+
+                if not os.path.exists(excel_path):
+                    # File not found - show error
+                    error_msg = (
+                        "Data file not found!\n\n"
+                        f"Expected path: {excel_path}\n\n"
+                        "File 'russia_inflation.xlsx' required for program operation\n"
+                        "in folder 'data' next to the program.\n\n"
+                        "File structure:\n"
+                        "- year (year)\n"
+                        "- inflation_rosstat (inflation in %)\n"
+                        "- indexation (indexation in %)"
+                    )
+                    action.finish('error')
+                    QMessageBox.critical(self, "Data Loading Error", error_msg)
+                    self.df = pd.DataFrame()
+                    return
+
+                # Read file (or its binary cache), check structure and convert data types
+                try:
+                    with action.stage('read'):
+                        self.df, has_missing = self.read_data_file(excel_path)
+                    print(f"Data loaded from Excel: {excel_path}")
+                except inflation_data.MissingColumnsError as e:
+                    error_msg = (
+                        "Invalid data format!\n\n"
+                        f"File missing columns: {', '.join(e.missing)}\n"
+                        f"Found columns: {', '.join(e.found)}\n\n"
+                        "Required columns:\n"
+                        "- year (year)\n"
+                        "- inflation_rosstat (inflation in %)\n"
+                        "- indexation (indexation in %)"
+                    )
+                    action.finish('error')
+                    QMessageBox.critical(self, "Data Format Error", error_msg)
+                    self.df = pd.DataFrame()
+                    return
+
+                # Missing values were filled
+                if has_missing:
+                    QMessageBox.warning(
+                        self,
+                        "Warning",
+                        "Missing values found in data. They will be filled."
+                    )
+
+                # Year-keyed arrays and totals of every window for the calculations
+                with action.stage('index'):
+                    self.year_index = compensation_engine.YearIndex.from_dataframe(self.df)
+                    self.window_table = compensation_engine.WindowTable(self.year_index)
+
+                # Update year lists
+                with action.stage('widgets'):
+                    years = self.df['year'].astype(int).tolist()
+                    self.end_year.blockSignals(True)
+                    self.end_year.clear()
+                    self.end_year.addItems([str(y) for y in self.year_index.years.tolist()[1:]])
+                    # Set 2025 as default end year if present in data
+                    self.end_year.setCurrentText("2025" if 2025 in years else str(max(years)))
+                    self.end_year.blockSignals(False)
+                    self.on_end_year_changed()
+                    self.data_model.set_table(self.year_index.years, self.year_index.inflation,
+                                              self.year_index.indexation)
+                    self.invalidate_sweep()
+
+                version = f", version {self.dataset['version']}" if self.dataset is not None else ""
+                self.calc_info_label.setText(
+                    f"Data loaded: {len(years)} years ({min(years)}-{max(years)}){version}")
+
+            except pd.errors.EmptyDataError:
+                action.finish('error')
+                QMessageBox.critical(self, "Error", "Data file is empty.")
                 self.df = pd.DataFrame()
-                return
 
-            # Check data structure
-            required_columns = ['year', 'inflation_rosstat', 'indexation']
-            missing_columns = [col for col in required_columns if col not in self.df.columns]
-
-            if missing_columns:
-                error_msg = (
-                    "Invalid data format!\n\n"
-                    f"File missing columns: {', '.join(missing_columns)}\n"
-                    f"Found columns: {', '.join(self.df.columns.tolist())}\n\n"
-                    "Required columns:\n"
-                    "- year (year)\n"
-                    "- inflation_rosstat (inflation in %)\n"
-                    "- indexation (indexation in %)"
-                )
-                QMessageBox.critical(self, "Data Format Error", error_msg)
+            except pd.errors.ParserError as e:
+                action.finish('error')
+                QMessageBox.critical(self, "Parsing Error", f"Error reading data file:\n{str(e)}")
                 self.df = pd.DataFrame()
-                return
-
-            # Convert data types
-            self.df['year'] = self.df['year'].astype(int)
-            self.df['inflation_rosstat'] = pd.to_numeric(self.df['inflation_rosstat'], errors='coerce')
-            self.df['indexation'] = pd.to_numeric(self.df['indexation'], errors='coerce')
 
-            # Check for missing values
-            if self.df.isnull().any().any():
-                QMessageBox.warning(
+            except Exception as e:
+                action.finish('error')
+                error_details = traceback.format_exc()
+                QMessageBox.critical(
                     self,
-                    "Warning",
-                    "Missing values found in data. They will be filled."
+                    "Data Loading Error",
+                    f"Failed to load data:\n\n{str(e)}\n\nDetails:\n{error_details}"
                 )
-                self.df = self.df.ffill()
-
-            # Update year list
-            years = self.df['year'].astype(int).tolist()
-            self.start_year.clear()
-            self.start_year.addItems([str(y) for y in years if y < 2025])
-
-            if years:
-                # Set 2020 as default if present in data
-                if 2020 in years:
-                    self.start_year.setCurrentText("2020")
-                else:
-                    self.start_year.setCurrentText(str(min(years)))
-
-            self.calc_info_label.setText(f"Data loaded: {len(years)} years ({min(years)}-{max(years)})")
-
-        except pd.errors.EmptyDataError:
-            QMessageBox.critical(self, "Error", "Data file is empty.")
-            self.df = pd.DataFrame()
+                self.df = pd.DataFrame()
 
-        except pd.errors.ParserError as e:
-            QMessageBox.critical(self, "Parsing Error", f"Error reading data file:\n{str(e)}")
-            self.df = pd.DataFrame()
+    def read_data_file(self, excel_path):
+        """Inflation table of the data file, through the data store if available
 
-        except Exception as e:
-            error_details = traceback.format_exc()
-            QMessageBox.critical(
-                self,
-                "Data Loading Error",
-                f"Failed to load data:\n\n{str(e)}\n\nDetails:\n{error_details}"
-            )
-            self.df = pd.DataFrame()
+        An unchanged file is read from the store without parsing Excel.
+        Returns the DataFrame and whether missing values were filled.
+        """
+        import pandas as pd
+
+        self.dataset = None
+        if self.store is not None:
+            try:
+                arrays, has_missing, self.dataset = self.store.load_table_arrays(excel_path)
+                return pd.DataFrame(arrays, columns=inflation_data.REQUIRED_COLUMNS), has_missing
+            except sqlite3.Error as e:
+                print(f"Data store is not available: {e}")
+        return inflation_data.load_inflation_table(excel_path)
+
+    def save_data_version(self):
+        """Store the edited table as a new version of the dataset"""
+        if self.store is None or self.year_index is None:
+            return
+        name = self.dataset['name'] if self.dataset is not None else os.path.abspath(
+            inflation_data.default_data_path())
+        try:
+            self.dataset = self.store.save_dataset(name, self.year_index.years, self.year_index.inflation,
+                                                   self.year_index.indexation)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Failed to save data version: {str(e)}")
+            return
+        self.statusBar().showMessage(
+            f"Data saved as {self.dataset_name()} version {self.dataset['version']} in {self.store.path}")
 
     def calculate(self):
         """Calculate compensation"""
@@ -784,108 +1186,202 @@ class PensionLagAnalyzer(QMainWindow):
 
             pension_2025 = float(self.pension_input.text())
             start = int(self.start_year.currentText())
-            end = 2025
+            end = int(self.end_year.currentText())
 
             if pension_2025 <= 0:
                 QMessageBox.warning(self, "Error", "Pension amount must be positive")
                 return
 
             if start >= end:
-                QMessageBox.warning(self, "Error", "Start year must be less than 2025")
+                QMessageBox.warning(self, "Error", "Start year must be less than end year")
                 return
 
-            self.results = self.calculate_compensation(pension_2025, start, end)
+            action = self.instrumentation.action('calculate', pension=pension_2025, start_year=start,
+                                                 end_year=end, years=end - start + 1)
+            self.start_task(self.run_calculation, self.on_calculation_finished, "Calculation error",
+                            pension_2025, start, end, self.year_index, action=action)
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Calculation error: {str(e)}")
+
+    def run_calculation(self, task, pension_2025, start, end, index):
+        """Calculation task with the data index it was started with
+
+        Results are shown by on_calculation_finished.
+        """
+        task.report_progress(10)
+        with self.current_action.stage('compute'):
+            results = self.calculate_compensation(pension_2025, start, end, index)
+        task.report_progress(100)
+        params = {'pension_2025': pension_2025, 'start_year': start, 'end_year': end}
+        return results, params, index
+
+    def on_calculation_finished(self, payload):
+        """Show results of background calculation"""
+        results, params, index = payload
+        self.show_results(results, params, self.current_action, index)
+
+    def show_results(self, results, params, action=instrumentation.DISABLED_ACTION, index=None):
+        """Show calculation results in labels, table and chart
+
+        index is the data index the results were calculated with, the
+        current one if None. Results of data edited since then stay stale,
+        so the live recalculation runs again with the current data.
+        """
+        self.results, self.calc_params = results, params
+        self.results_index = self.year_index if index is None else index
+        self.results_stale = self.results_index.content_hash != self.year_index.content_hash
+        start = self.calc_params['start_year']
+        end = self.calc_params['end_year']
+        with action.stage('comparison'):
+            self.comparison_result = self.calculate_comparison(params)
+            self.show_comparison_totals()
+        with action.stage('update_results'):
             self.update_results(self.results, start, end)
+        with action.stage('update_table'):
             self.update_table(self.results)
+        with action.stage('plot_chart'):
             self.plot_chart(self.results)
+        if action.enabled:
+            # Chart is normally rendered later by the event loop; render now to time it
+            with action.stage('render_chart'):
+                self.canvas.draw()
 
-            self.export_excel_btn.setEnabled(True)
+        self.export_excel_btn.setEnabled(True)
+        self.export_data_btn.setEnabled(True)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Calculation error: {str(e)}")
+    def start_task(self, fn, on_finished, error_message, *args, action=instrumentation.DISABLED_ACTION):
+        """Run fn(task, *args) in background with progress and cancellation
 
-    def calculate_compensation(self, pension_2025, start_year, end_year):
-        """Calculate inflation lag compensation"""
-        # Restore pensions
-        yearly_pensions = {}
-        current_pension = pension_2025
-        yearly_pensions[end_year] = current_pension
-
-        for year in range(end_year - 1, start_year - 1, -1):
-            next_year_data = self.df[self.df['year'] == year + 1]
-            if not next_year_data.empty:
-                next_row = next_year_data.iloc[0]
-                indexation_rate = next_row['indexation'] / 100.0
-                current_pension = current_pension / (1.0 + indexation_rate)
-            yearly_pensions[year] = current_pension
-
-        details = []
-        yearly_summary = {}
-        total_paid = 0.0
-        total_compensation = 0.0
-
-        for year in range(start_year, end_year + 1):
-            if year not in yearly_pensions:
-                continue
-
-            year_data = self.df[self.df['year'] == year]
-            if year_data.empty:
-                continue
-
-            row = year_data.iloc[0]
-            inflation_rate = row['inflation_rosstat'] / 100.0
-            pension = yearly_pensions[year]
-            monthly_inflation = (1.0 + inflation_rate) ** (1.0 / 12.0) - 1.0
-
-            year_paid = 0.0
-            year_compensation = 0.0
-
-            # Compensation calculation using formula
-            for month in range(1, 13):
-                price_growth = (1.0 + monthly_inflation) ** month
-                monthly_paid = pension
-                monthly_compensation = monthly_paid * (1.0 - 1.0 / price_growth)
-
-                year_paid += monthly_paid
-                year_compensation += monthly_compensation
-                total_paid += monthly_paid
-                total_compensation += monthly_compensation
-
-                details.append({
-                    'Year': year,
-                    'Month': month,
-                    'Pension': round(pension, 4),
-                    'Paid': round(monthly_paid, 4),
-                    'Compensation': round(monthly_compensation, 4)
-                })
-
-            loss_percentage = (year_compensation / year_paid * 100.0) if year_paid > 0 else 0.0
-
-            yearly_summary[year] = {
-                'pension_in_january': pension,
-                'inflation_year': inflation_rate * 100.0,
-                'indexation_year': row['indexation'],
-                'sum_per_year': year_paid,
-                'compensation_per_year': year_compensation,
-                'compensation_per_month': year_compensation / 12.0,
-                'loss_percentage': loss_percentage,
-                'total_compensation': 0.0
-            }
+        The instrumentation action, if any, is available to the task and
+        the finished handler as self.current_action and is finished with
+        the task.
+        """
+        task = Task(fn, *args)
+        task.signals.progress.connect(self.progress_bar.setValue)
+        task.signals.finished.connect(on_finished)
+        task.signals.error.connect(lambda *args: action.finish('error'))
+        task.signals.error.connect(
+            lambda message, details: QMessageBox.critical(self, "Error", f"{error_message}: {message}")
+        )
+        task.signals.cancelled.connect(lambda: action.finish('cancelled'))
+        task.signals.cancelled.connect(lambda: self.calc_info_label.setText("Operation cancelled"))
+        for signal in (task.signals.finished, task.signals.error, task.signals.cancelled):
+            signal.connect(self.task_done)
+
+        self.current_task = task
+        self.current_action = action
+        self.set_busy(True)
+        self.thread_pool.start(task)
+
+    def task_done(self, *args):
+        """Background task finished, failed or was cancelled"""
+        self.current_action.finish()
+        self.current_task = None
+        self.current_action = instrumentation.DISABLED_ACTION
+        self.set_busy(False)
+
+    def cancel_task(self):
+        """Cancel running background task"""
+        if self.current_task is not None:
+            self.current_task.cancel()
+
+    def set_busy(self, busy):
+        """Show progress controls while background task runs"""
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(busy)
+        self.cancel_btn.setVisible(busy)
+        self.calc_btn.setEnabled(not busy)
+        self.add_datasets_btn.setEnabled(not busy)
+        self.export_excel_btn.setEnabled(not busy and self.results is not None)
+        self.export_data_btn.setEnabled(not busy and self.results is not None)
+
+    def on_end_year_changed(self):
+        """Update start year list and pension label for new end year"""
+        if self.year_index is None or not self.end_year.currentText():
+            return
+        end = int(self.end_year.currentText())
+        self.pension_label.setText(f"Pension amount in {end} (RUB):")
+        self.pension_input.setToolTip(f"Enter pension amount in rubles for {end}")
+
+        # Start year must be before end year; keep current choice if possible
+        current = self.start_year.currentText()
+        start_years = [str(y) for y in self.year_index.years.tolist() if y < end]
+        self.start_year.blockSignals(True)
+        self.start_year.clear()
+        self.start_year.addItems(start_years)
+        if current in start_years:
+            self.start_year.setCurrentText(current)
+        elif "2020" in start_years:
+            # Set 2020 as default if present in data
+            self.start_year.setCurrentText("2020")
+        elif start_years:
+            self.start_year.setCurrentText(start_years[0])
+        self.start_year.blockSignals(False)
+
+        self.update_window_preview()
+
+    def update_window_preview(self):
+        """Show totals of the selected window from the precomputed window table"""
+        if self.window_table is None or not self.start_year.currentText() or not self.end_year.currentText():
+            return
+        try:
+            pension_2025 = float(self.pension_input.text())
+        except ValueError:
+            return
+        start = int(self.start_year.currentText())
+        end = int(self.end_year.currentText())
+        if pension_2025 <= 0 or start >= end:
+            return
+        self.update_results(self.window_table.window(start, end, pension_2025), start, end)
+
+    def schedule_live_update(self, *args):
+        """Recalculate shortly after the last input change"""
+        self.live_timer.start()
+
+    def live_recalculate(self):
+        """Recalculate after inputs stopped changing or the data was edited
+
+        A cached window is only rescaled to the new pension, which is fast
+        enough to run in the GUI thread; a new window is calculated in the
+        background like the Calculate button does.
+        """
+        if self.year_index is None:
+            return
+        if self.current_task is not None:
+            # Try again when the running task is finished
+            self.live_timer.start()
+            return
+        try:
+            pension_2025 = float(self.pension_input.text())
+            start = int(self.start_year.currentText())
+            end = int(self.end_year.currentText())
+        except ValueError:
+            return
+        if pension_2025 <= 0 or start >= end:
+            return
 
-        # Cumulative compensation
-        cumulative_compensation = 0.0
-        for year in sorted(yearly_summary.keys()):
-            cumulative_compensation += yearly_summary[year]['compensation_per_year']
-            yearly_summary[year]['total_compensation'] = cumulative_compensation
-
-        return {
-            'total_paid': total_paid,
-            'total_compensation': total_compensation,
-            'loss_percentage': (total_compensation / total_paid * 100.0) if total_paid > 0 else 0.0,
-            'details': details,
-            'yearly_summary': yearly_summary,
-            'yearly_pensions': yearly_pensions
-        }
+        params = {'pension_2025': pension_2025, 'start_year': start, 'end_year': end}
+        if params == self.calc_params and not self.results_stale:
+            return
+        if not self.result_cache.contains(self.year_index, start, end):
+            action = self.instrumentation.action('calculate', pension=pension_2025, start_year=start,
+                                                 end_year=end, years=end - start + 1)
+            self.start_task(self.run_calculation, self.on_calculation_finished, "Calculation error",
+                            pension_2025, start, end, self.year_index, action=action)
+            return
+
+        with self.instrumentation.measure('live_update', pension=pension_2025, start_year=start,
+                                          end_year=end) as action:
+            with action.stage('rescale'):
+                results = self.calculate_compensation(pension_2025, start, end)
+            self.show_results(results, params, action)
+
+    def calculate_compensation(self, pension_2025, start_year, end_year, index=None):
+        """Calculate inflation lag compensation, with the current data unless index is given"""
+        if index is None:
+            index = self.year_index
+        return self.result_cache.calculate_compensation(index, pension_2025, start_year, end_year)
 
     def update_results(self, result, start_year, end_year):
         """Update results on panel"""
@@ -917,147 +1413,144 @@ class PensionLagAnalyzer(QMainWindow):
         if not result['yearly_summary']:
             return
 
-        years = sorted(result['yearly_summary'].keys())
-        self.table.setRowCount(len(years))
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            'Year',
-            'Pension\namount',
-            'Inflation\n(%)',
-            'Indexation\n(%)',
-            'Paid\nper year',
-            'Losses\nper month',
-            'Losses per year\n(compensation)',  # Wide column
-            'Accumulated\nlosses'  # Changed name
-        ])
-
-        # Set column widths - now all columns are stretchable
-        header = self.table.horizontalHeader()
-        for col in range(8):
-            header.setSectionResizeMode(col, QHeaderView.Stretch)
-
-        for i, year in enumerate(years):
-            data = result['yearly_summary'][year]
-
-            # Year - black font
-            year_item = QTableWidgetItem(str(year))
-            year_item.setTextAlignment(Qt.AlignCenter)
-            year_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 0, year_item)
-
-            # Pension - black font
-            pension_item = QTableWidgetItem(f"{data['pension_in_january']:,.2f}".replace(',', ' '))
-            pension_item.setTextAlignment(Qt.AlignCenter)
-            pension_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 1, pension_item)
-
-            # Inflation - black font
-            inflation_item = QTableWidgetItem(f"{data['inflation_year']:.2f}%")
-            inflation_item.setTextAlignment(Qt.AlignCenter)
-            inflation_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 2, inflation_item)
-
-            # Indexation (precision to tenths) - black font
-            indexation_item = QTableWidgetItem(f"{data['indexation_year']:.1f}%")
-            indexation_item.setTextAlignment(Qt.AlignCenter)
-            indexation_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 3, indexation_item)
-
-            # Paid per year - black font
-            paid_item = QTableWidgetItem(f"{data['sum_per_year']:,.0f}".replace(',', ' '))
-            paid_item.setTextAlignment(Qt.AlignCenter)
-            paid_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 4, paid_item)
-
-            # Losses per month - black font
-            monthly_loss_item = QTableWidgetItem(f"{data['compensation_per_month']:,.0f}".replace(',', ' '))
-            monthly_loss_item.setTextAlignment(Qt.AlignCenter)
-            monthly_loss_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 5, monthly_loss_item)
-
-            # Losses per year (compensation) - red font preserved
-            year_loss_item = QTableWidgetItem(f"{data['compensation_per_year']:,.0f}".replace(',', ' '))
-            year_loss_item.setTextAlignment(Qt.AlignCenter)
-            year_loss_item.setForeground(QColor(128, 0, 0))  # Red font preserved
-            year_loss_item.setFont(QFont("Arial", 10, QFont.Bold))
-            self.table.setItem(i, 6, year_loss_item)
-
-            # Accumulated losses - black font
-            cumulative_item = QTableWidgetItem(f"{data['total_compensation']:,.0f}".replace(',', ' '))
-            cumulative_item.setTextAlignment(Qt.AlignCenter)
-            cumulative_item.setForeground(QColor(0, 0, 0))  # Black font
-            self.table.setItem(i, 7, cumulative_item)
-
-            # Alternating row background
-            if i % 2 == 0:
-                for col in range(8):
-                    item = self.table.item(i, col)
-                    if item:
-                        item.setBackground(QColor(245, 245, 245))
+        self.table_model.set_result(result)
+        if self.comparison_result is not None:
+            columns = result['summary_columns']['year'] - self.comparison_result['years'][0]
+            values = self.comparison_result['summary_columns']['compensation_per_year'][1:, columns]
+            self.table_model.set_comparison(self.comparison, values)
+        else:
+            self.table_model.set_comparison([], [])
+
+    def ensure_chart(self):
+        """Create chart on first use"""
+        if self.chart is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+
+            self.figure = Figure(figsize=(8, 5.5))
+            self.canvas = FigureCanvas(self.figure)
+            self.chart = CompensationChart(self.figure, self.canvas)
+            self.chart_layout.addWidget(self.canvas)
+        return self.chart
 
     def plot_chart(self, result):
         """Build chart"""
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-
+        chart = self.ensure_chart()
         if not result['yearly_summary']:
+            chart.clear()
             return
 
-        years = sorted(result['yearly_summary'].keys())
-        pensions = [result['yearly_summary'][y]['pension_in_january'] for y in years]
-        compensations = [result['yearly_summary'][y]['compensation_per_year'] for y in years]
-        cumulative_compensations = [result['yearly_summary'][y]['total_compensation'] for y in years]
-
-        x_pos = np.arange(len(years))
-        bar_width = 0.35
-
-        # Bars: pensions and compensations (losses)
-        bars_pension = ax.bar(x_pos - bar_width / 2, pensions, bar_width,
-                              color='#243e4a', alpha=0.7, label='Pension amount')
-
-        bars_compensation = ax.bar(x_pos + bar_width / 2, compensations, bar_width,
-                                   color='#800000', alpha=0.7, label='Losses per year (compensation)')
-
-        # Accumulated losses line
-        line_cumulative = ax.plot(x_pos, cumulative_compensations, 'o-',
-                                  color='#556b2f', linewidth=2, markersize=6,
-                                  label='Accumulated losses')[0]
-
-        # Labels on pension bars
-        for bar in bars_pension:
-            height = bar.get_height()
-            if height > 0:
-                ax.text(bar.get_x() + bar.get_width() / 2, height,
-                        f'{height:,.0f}'.replace(',', ' '),
-                        ha='center', va='bottom', fontsize=8, color='#243e4a')
-
-        # Labels on compensation bars (losses)
-        for bar in bars_compensation:
-            height = bar.get_height()
-            if height > 0:
-                ax.text(bar.get_x() + bar.get_width() / 2, height,
-                        f'{height:,.0f}'.replace(',', ' '),
-                        ha='center', va='bottom', fontsize=8, color='#800000', fontweight='bold')
-
-        # Labels on accumulated losses line
-        for i, (x, y) in enumerate(zip(x_pos, cumulative_compensations)):
-            ax.text(x, y, f'{y:,.0f}'.replace(',', ' '),
-                    ha='center', va='bottom', fontsize=8, color='#556b2f', fontweight='bold')
-
-        ax.set_title('Pension Dynamics and Inflation Lag Losses', fontsize=12, fontweight='bold')
-        ax.set_xlabel('Year', fontsize=10)
-        ax.set_ylabel('Amount, RUB', fontsize=10)
-
-        ax.set_xticks(x_pos)
-        ax.set_xticklabels([str(y) for y in years], fontsize=9)
-        ax.tick_params(axis='y', labelsize=9)
-
-        ax.legend(fontsize=9, loc='upper left')
-        ax.grid(True, alpha=0.3, axis='y')
-        ax.margins(y=0.1)
-
-        self.figure.tight_layout()
-        self.canvas.draw()
+        columns = result['summary_columns']
+        comparison = []
+        if self.comparison_result is not None:
+            offsets = columns['year'] - self.comparison_result['years'][0]
+            cumulative = self.comparison_result['summary_columns']['total_compensation'][1:, offsets]
+            comparison = list(zip(self.comparison, cumulative))
+        chart.update(
+            columns['year'].tolist(),
+            columns['pension_in_january'],
+            columns['compensation_per_year'],
+            columns['total_compensation'],
+            comparison
+        )
+
+    def add_comparison_datasets(self):
+        """Choose data files to compare with the main dataset"""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select Inflation Data Files", os.path.dirname(inflation_data.default_data_path()),
+            "Excel files (*.xlsx *.xls)"
+        )
+        if paths:
+            self.load_comparison_datasets(paths)
+
+    def load_comparison_datasets(self, paths):
+        """Load data files in the background and add them to the comparison"""
+        self.start_task(self.run_dataset_loading, self.on_datasets_loaded, "Data loading error", paths)
+
+    def run_dataset_loading(self, task, paths):
+        """Loading task: data files are read concurrently on a thread pool"""
+        loaded = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as executor:
+            futures = {executor.submit(self.read_dataset, path): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    loaded[path] = future.result()
+                except Exception as e:
+                    errors[path] = str(e)
+                task.report_progress(done * 100 // len(paths))
+        # Keep the order in which the files were chosen
+        return [(path, loaded[path]) for path in paths if path in loaded], errors
+
+    def read_dataset(self, path):
+        """YearIndex of a comparison data file, through the data store if available"""
+        if self.store is not None:
+            arrays = self.store.load_table_arrays(path)[0]
+        else:
+            arrays = inflation_data.load_table_arrays(path)[0]
+        return compensation_engine.YearIndex(arrays['year'], arrays['inflation_rosstat'], arrays['indexation'])
+
+    def on_datasets_loaded(self, payload):
+        """Add loaded datasets to the comparison and recalculate"""
+        loaded, errors = payload
+        for path, index in loaded:
+            name = base = os.path.splitext(os.path.basename(path))[0]
+            number = 2
+            while name in self.comparison:
+                name = f"{base} ({number})"
+                number += 1
+            self.comparison[name] = index
+        if errors:
+            QMessageBox.warning(
+                self, "Data Loading Error",
+                "Failed to load:\n\n" + "\n".join(f"{os.path.basename(path)}: {message}"
+                                                   for path, message in errors.items())
+            )
+        self.refresh_comparison()
+
+    def clear_comparison(self):
+        """Remove all comparison datasets"""
+        self.comparison.clear()
+        self.refresh_comparison()
+
+    def refresh_comparison(self):
+        """Show the comparison with the current results, or the list of datasets"""
+        if self.results is not None:
+            self.show_results(self.results, self.calc_params, index=self.results_index)
+        else:
+            self.show_comparison_totals()
+
+    def calculate_comparison(self, params):
+        """Main and comparison datasets for the window of params, in one batched pass"""
+        if not self.comparison or self.year_index is None:
+            return None
+        return compensation_engine.calculate_compensation_comparison(
+            [self.year_index] + list(self.comparison.values()),
+            params['pension_2025'], params['start_year'], params['end_year']
+        )
+
+    def show_comparison_totals(self):
+        """List comparison datasets with their total losses"""
+        if not self.comparison:
+            self.comparison_label.setText("Add data files of regions, other inflation measures or countries")
+            return
+        names = [self.dataset_name()] + list(self.comparison)
+        if self.comparison_result is None:
+            self.comparison_label.setText("\n".join(names[1:]))
+            return
+        lines = [
+            f"{name}: {total:,.0f} RUB ({percentage:.2f}%)".replace(',', ' ')
+            for name, total, percentage in zip(names, self.comparison_result['total_compensation'].tolist(),
+                                               self.comparison_result['loss_percentage'].tolist())
+        ]
+        self.comparison_label.setText("Total losses:\n" + "\n".join(lines))
+
+    def dataset_name(self):
+        """Name of the main dataset"""
+        if self.dataset is not None:
+            return os.path.splitext(os.path.basename(self.dataset['name']))[0]
+        return os.path.splitext(os.path.basename(inflation_data.default_data_path()))[0]
 
     def export_to_excel(self):
         """Export to Excel with formatting"""
@@ -1073,164 +1566,62 @@ class PensionLagAnalyzer(QMainWindow):
         file_name = f"inflation_lag_compensation_{timestamp}.xlsx"
         file_path = os.path.join(result_dir, file_name)
 
-        try:
-            from openpyxl import Workbook
-            from openpyxl.styles import (
-                Alignment, PatternFill, Font, Border, Side
-            )
-            from openpyxl.utils import get_column_letter
-
-            wb = Workbook()
-
-            # Sheet 1: Yearly summary
-            ws1 = wb.active
-            ws1.title = "Yearly Summary"
-
-            headers = [
-                'Year',
-                'Pension in January',
-                'Inflation (%)',
-                'Indexation (%)',
-                'Paid per year',
-                'Losses per month',
-                'Losses per year (compensation)',
-                'Loss percentage (%)',
-                'Accumulated losses'  # Changed name
-            ]
-
-            ws1.append(headers)
-
-            header_fill = PatternFill(start_color="2d4a24", end_color="2d4a24", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True, size=12)
-            center_alignment = Alignment(horizontal="center", vertical="center")
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+        action = self.instrumentation.action('export_to_excel', years=len(self.results['yearly_summary']))
+        self.start_task(self.run_export, self.on_export_finished, "Failed to save Excel file",
+                        file_path, self.results, self.calc_params, self.df,
+                        self.export_details_check.isChecked(), action=action)
 
-            for col in range(1, len(headers) + 1):
-                cell = ws1.cell(row=1, column=col)
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = center_alignment
-                cell.border = thin_border
-                ws1.column_dimensions[get_column_letter(col)].width = 18
-
-            row_num = 2
-            for year in sorted(self.results['yearly_summary'].keys()):
-                data = self.results['yearly_summary'][year]
-
-                row_data = [
-                    year,
-                    round(data['pension_in_january'], 2),
-                    round(data['inflation_year'], 2),
-                    round(data['indexation_year'], 1),  # Precision to tenths
-                    round(data['sum_per_year'], 2),
-                    round(data['compensation_per_month'], 2),  # Losses per month
-                    round(data['compensation_per_year'], 2),  # Losses per year (compensation)
-                    round(data['loss_percentage'], 2),
-                    round(data['total_compensation'], 2)  # Accumulated losses
-                ]
-
-                ws1.append(row_data)
-
-                for col in range(1, len(row_data) + 1):
-                    cell = ws1.cell(row=row_num, column=col)
-                    cell.alignment = center_alignment
-                    cell.border = thin_border
-
-                    if col in [2, 5, 6, 7, 9]:  # Monetary values
-                        cell.number_format = '#,##0.00'
-                    elif col in [3, 4, 8]:  # Percentages
-                        cell.number_format = '0.0"%"' if col == 4 else '0.00"%"'  # Indexation to tenths
-
-                    if row_num % 2 == 0:
-                        cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-
-                loss_cell = ws1.cell(row=row_num, column=7)  # Losses per year
-                loss_cell.font = Font(color="800000", bold=True)
-
-                row_num += 1
-
-            # Sheet 2: Summary
-            ws2 = wb.create_sheet(title="Summary")
-
-            loss_percentage = self.results['loss_percentage']
-
-            summary_data = [
-                ["Parameter", "Value"],
-                ["Analysis start year", int(self.start_year.currentText())],
-                ["Analysis end year", 2025],
-                ["Pension amount in 2025", float(self.pension_input.text())],
-                ["Total analysis months", (2025 - int(self.start_year.currentText()) + 1) * 12],
-                ["Total paid", round(self.results['total_paid'], 2)],
-                ["Total losses", round(self.results['total_compensation'], 2)],  # Changed
-                ["Loss percentage (%)", f"{loss_percentage:.2f}%"],
-                ["Average monthly losses",
-                 round(self.results['total_compensation'] / ((2025 - int(self.start_year.currentText()) + 1) * 12), 2)],
-                ["Calculation date", pd.Timestamp.now().strftime("%d.%m.%Y %H:%M:%S")]
-            ]
-
-            for row in summary_data:
-                ws2.append(row)
-
-            for col in range(1, 3):
-                cell = ws2.cell(row=1, column=col)
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = center_alignment
-                cell.border = thin_border
-
-            for row in range(2, len(summary_data) + 1):
-                for col in range(1, 3):
-                    cell = ws2.cell(row=row, column=col)
-                    cell.alignment = Alignment(horizontal="left" if col == 1 else "right", vertical="center")
-                    cell.border = thin_border
-                    if row % 2 == 0:
-                        cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-
-            ws2.column_dimensions['A'].width = 30
-            ws2.column_dimensions['B'].width = 20
-
-            # Sheet 3: Source data
-            ws3 = wb.create_sheet(title="Source Data")
-
-            source_headers = ['Year', 'Rosstat Inflation (%)', 'Pension Indexation (%)']
-            ws3.append(source_headers)
-
-            for col in range(1, 4):
-                cell = ws3.cell(row=1, column=col)
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = center_alignment
-                cell.border = thin_border
-                ws3.column_dimensions[get_column_letter(col)].width = 20
-
-            for _, row in self.df.iterrows():
-                ws3.append([row['year'], row['inflation_rosstat'], row['indexation']])
-
-            for row in range(2, len(self.df) + 2):
-                for col in range(1, 4):
-                    cell = ws3.cell(row=row, column=col)
-                    cell.alignment = center_alignment
-                    cell.border = thin_border
-                    if row % 2 == 0:
-                        cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-                    if col in [2, 3]:
-                        cell.number_format = '0.0"%"' if col == 3 else '0.00"%"'  # Indexation to tenths
-
-            wb.save(file_path)
-
-            QMessageBox.information(
-                self,
-                "Success",
-                f"Calculation results saved:\n{file_path}"
-            )
+    def run_export(self, task, file_path, results, params, source_df, include_details):
+        """Export task: write Excel file in background"""
+        with self.current_action.stage('write'):
+            exporters.write_excel_report(file_path, results, params, source_df, task.report_progress,
+                                         include_details)
+        return file_path
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save Excel file: {str(e)}")
+    def export_data(self):
+        """Export yearly summary and monthly details in a columnar format"""
+        if self.results is None:
+            QMessageBox.warning(self, "Error", "Perform calculation first")
+            return
+
+        result_dir = "Result"
+        if not os.path.exists(result_dir):
+            os.makedirs(result_dir)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = DATA_EXPORT_FORMATS[self.data_format.currentText()]
+        summary_path = os.path.join(result_dir, f"inflation_lag_summary_{timestamp}{extension}")
+        details_path = None
+        if self.export_details_check.isChecked():
+            details_path = os.path.join(result_dir, f"inflation_lag_details_{timestamp}{extension}")
+
+        action = self.instrumentation.action('export_data', format=self.data_format.currentText(),
+                                             details=details_path is not None)
+        self.start_task(self.run_data_export, self.on_export_finished, "Failed to save data file",
+                        self.results, summary_path, details_path, action=action)
+
+    def run_data_export(self, task, results, summary_path, details_path):
+        """Export task: write columnar files in background"""
+        with self.current_action.stage('write'):
+            exporters.write_result_columns(results, summary_path, details_path, progress=task.report_progress)
+        return '\n'.join(path for path in (summary_path, details_path) if path)
+
+    def on_export_finished(self, file_path):
+        """Export finished in background"""
+        QMessageBox.information(
+            self,
+            "Success",
+            f"Calculation results saved:\n{file_path}"
+        )
+
+    def closeEvent(self, event):
+        """Stop background task before closing"""
+        if self.current_task is not None:
+            self.current_task.cancel()
+        self.thread_pool.waitForDone()
+        if self.store is not None:
+            self.store.close()
+        super().closeEvent(event)
 
 
 def main():
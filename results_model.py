@@ -0,0 +1,101 @@
+"""Table model for calculation results."""
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor, QFont
+
+
+def _money(decimals):
+    return lambda value: f"{value:,.{decimals}f}".replace(',', ' ')
+
+
+def _percent(decimals):
+    return lambda value: f"{value:.{decimals}f}%"
+
+
+class SummaryTableModel(QAbstractTableModel):
+    """Yearly summary backed by column arrays
+
+    Cells are formatted in data() only when the view asks for them, so the
+    cost depends on the visible rows rather than on the size of the result.
+    Losses per year of comparison datasets can be shown as extra columns.
+    """
+
+    # (result column, header, formatter)
+    COLUMNS = [
+        ('year', 'Year', str),
+        ('pension_in_january', 'Pension\namount', _money(2)),
+        ('inflation_year', 'Inflation\n(%)', _percent(2)),
+        ('indexation_year', 'Indexation\n(%)', _percent(1)),  # Precision to tenths
+        ('sum_per_year', 'Paid\nper year', _money(0)),
+        ('compensation_per_month', 'Losses\nper month', _money(0)),
+        ('compensation_per_year', 'Losses per year\n(compensation)', _money(0)),  # Wide column
+        ('total_compensation', 'Accumulated\nlosses', _money(0))
+    ]
+    # Losses per year (compensation) - red bold font
+    HIGHLIGHT_COLUMN = 6
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [np.empty(0) for _ in self.COLUMNS]
+        self._rows = 0
+        self._comparison_names = []
+        self._comparison = np.empty((0, 0))
+        self._black = QColor(0, 0, 0)
+        self._red = QColor(128, 0, 0)
+        self._stripe = QColor(245, 245, 245)
+        self._bold = QFont("Arial", 10, QFont.Bold)
+        self._money = _money(0)
+
+    def set_result(self, result):
+        """Show yearly summary of a calculation result"""
+        columns = result['summary_columns']
+        self.beginResetModel()
+        self._columns = [columns[key] for key, _, _ in self.COLUMNS]
+        self._rows = len(self._columns[0])
+        self.endResetModel()
+
+    def set_comparison(self, names, values):
+        """Show losses per year of other datasets next to the result
+
+        values is a (datasets × rows) array aligned with the rows of the
+        result; NaN marks years missing from a dataset.
+        """
+        self.beginResetModel()
+        self._comparison_names = list(names)
+        self._comparison = values
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS) + len(self._comparison_names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col >= len(self.COLUMNS):
+                value = self._comparison[col - len(self.COLUMNS)][row].item()
+                return '–' if np.isnan(value) else self._money(value)
+            return self.COLUMNS[col][2](self._columns[col][row].item())
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.ForegroundRole:
+            return self._red if col == self.HIGHLIGHT_COLUMN or col >= len(self.COLUMNS) else self._black
+        if role == Qt.FontRole and col == self.HIGHLIGHT_COLUMN:
+            return self._bold
+        # Alternating row background
+        if role == Qt.BackgroundRole and row % 2 == 0:
+            return self._stripe
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            if section >= len(self.COLUMNS):
+                return f"Losses per year\n{self._comparison_names[section - len(self.COLUMNS)]}"
+            return self.COLUMNS[section][1]
+        return super().headerData(section, orientation, role)
@@ -0,0 +1,272 @@
+"""Monte Carlo scenarios of inflation and pension indexation.
+
+A scenario draws N paths of yearly inflation and indexation for the analysis
+window, either by resampling historical years or from a bivariate normal
+distribution, and calculates compensation for every path. All paths of a
+chunk are evaluated together as (paths × years) arrays with the closed-form
+series coefficients, so no per-path calculation is run.
+
+Chunks can be processed by a process pool. Every chunk has its own random
+stream spawned from one seed, so the results do not depend on the number
+of workers.
+
+Usage:
+    python scenarios.py --pension 25000 --start 2015 --paths 100000
+    python scenarios.py --pension 25000 --start 2026 --end 2035 --method normal --inflation-mean 6
+    python scenarios.py --pension 25000 --start 2015 --paths 1000000 --workers 0 --output paths.parquet
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import compensation_engine
+import exporters
+import inflation_data
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_CHUNK_SIZE = 50_000
+TOTAL_COLUMNS = ['total_paid', 'total_compensation', 'loss_percentage']
+
+# Lowest drawn rate in percent; keeps every growth factor positive
+MIN_RATE = -99.0
+
+
+class BootstrapSampler:
+    """Years drawn with replacement from the historical table
+
+    Inflation and indexation of a drawn year are taken together, so their
+    correlation is preserved. from_year/to_year limit the sampled history.
+    """
+
+    def __init__(self, index, from_year=None, to_year=None):
+        window = index.window(from_year if from_year is not None else index.first_year,
+                              to_year if to_year is not None else index.last_year)
+        self.inflation = index.inflation[window]
+        self.indexation = index.indexation[window]
+        if not len(self.inflation):
+            raise ValueError("No data years to sample from")
+
+    def draw(self, rng, n_paths, n_years):
+        rows = rng.integers(len(self.inflation), size=(n_paths, n_years))
+        return self.inflation[rows], self.indexation[rows]
+
+
+class NormalSampler:
+    """Inflation and indexation drawn from a bivariate normal distribution
+
+    Means and standard deviations are in percent; draws are clipped at
+    MIN_RATE.
+    """
+
+    def __init__(self, inflation_mean, inflation_std, indexation_mean, indexation_std, correlation=0.0):
+        if inflation_std < 0 or indexation_std < 0:
+            raise ValueError("Standard deviations must not be negative")
+        if not -1.0 <= correlation <= 1.0:
+            raise ValueError("Correlation must be between -1 and 1")
+        self.inflation_mean = inflation_mean
+        self.inflation_std = inflation_std
+        self.indexation_mean = indexation_mean
+        self.indexation_std = indexation_std
+        self.correlation = correlation
+
+    @classmethod
+    def from_history(cls, index, **parameters):
+        """Distribution fitted to the historical table; parameters override the fit"""
+        fitted = {
+            'inflation_mean': float(index.inflation.mean()),
+            'inflation_std': float(index.inflation.std(ddof=1)) if len(index) > 1 else 0.0,
+            'indexation_mean': float(index.indexation.mean()),
+            'indexation_std': float(index.indexation.std(ddof=1)) if len(index) > 1 else 0.0,
+            'correlation': 0.0
+        }
+        if len(index) > 2 and fitted['inflation_std'] > 0 and fitted['indexation_std'] > 0:
+            fitted['correlation'] = float(np.corrcoef(index.inflation, index.indexation)[0, 1])
+        fitted.update({key: value for key, value in parameters.items() if value is not None})
+        return cls(**fitted)
+
+    def draw(self, rng, n_paths, n_years):
+        z = rng.standard_normal((2, n_paths, n_years))
+        inflation = self.inflation_mean + self.inflation_std * z[0]
+        correlated = self.correlation * z[0] + np.sqrt(1.0 - self.correlation ** 2) * z[1]
+        indexation = self.indexation_mean + self.indexation_std * correlated
+        return np.maximum(inflation, MIN_RATE), np.maximum(indexation, MIN_RATE)
+
+
+def evaluate_paths(inflation, indexation, pension_2025=1.0, yearly=False):
+    """Totals for paths of yearly inflation and indexation
+
+    inflation and indexation are (paths × years) arrays in percent for
+    consecutive years of the window, the last column being the end year.
+    Pensions are restored from the end-year amount as in
+    calculate_compensation. Returns total_paid, total_compensation and
+    loss_percentage arrays with one value per path; with yearly, also the
+    (paths × years) compensation_per_year array.
+    """
+    log_growth = np.log1p(np.asarray(indexation, dtype=float) / 100.0)
+    # Indexations of the years after each year, up to the end year
+    later = log_growth.sum(axis=1, keepdims=True) - np.cumsum(log_growth, axis=1)
+    pensions = pension_2025 * np.exp(-later)
+    compensation = pensions * compensation_engine.series_coefficients(inflation)
+
+    total_paid = 12.0 * pensions.sum(axis=1)
+    total_compensation = compensation.sum(axis=1)
+    results = {
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': np.divide(
+            total_compensation * 100.0, total_paid,
+            out=np.zeros_like(total_paid), where=total_paid > 0
+        )
+    }
+    if yearly:
+        results['compensation_per_year'] = compensation
+    return results
+
+
+def _simulate_chunk(sampler, seed, n_paths, n_years, pension_2025, yearly):
+    """Draw and evaluate one chunk of paths"""
+    inflation, indexation = sampler.draw(np.random.default_rng(seed), n_paths, n_years)
+    return evaluate_paths(inflation, indexation, pension_2025, yearly)
+
+
+def run_scenarios(sampler, n_paths, start_year, end_year, pension_2025=1.0, seed=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE, workers=1, yearly=False):
+    """Simulate n_paths paths for start_year..end_year
+
+    workers=1 runs in the current process, workers=None uses all cores.
+    The same seed gives the same paths for any number of workers. Returns
+    the evaluate_paths arrays for all paths and the simulated years.
+    """
+    if n_paths < 1:
+        raise ValueError("Number of paths must be positive")
+    if start_year > end_year:
+        raise ValueError("Start year must not be later than end year")
+    n_years = end_year - start_year + 1
+    sizes = [min(chunk_size, n_paths - first) for first in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(sampler, chunk_seed, size, n_years, pension_2025, yearly) for chunk_seed, size in zip(seeds, sizes)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        chunks = [_simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            chunks = list(executor.map(_simulate_chunk, *zip(*tasks)))
+
+    results = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+    results['years'] = np.arange(start_year, end_year + 1)
+    return results
+
+
+def percentile_bands(values, percentiles=DEFAULT_PERCENTILES):
+    """Percentiles over paths: a number per percentile, or a yearly array for 2-D values"""
+    bands = np.percentile(values, percentiles, axis=0)
+    return {p: band.tolist() if np.ndim(band) else float(band) for p, band in zip(percentiles, bands)}
+
+
+def summarize(results, percentiles=DEFAULT_PERCENTILES):
+    """Mean and percentile bands of the totals, and yearly bands if simulated"""
+    summary = {
+        key: {'mean': float(results[key].mean()), 'percentiles': percentile_bands(results[key], percentiles)}
+        for key in TOTAL_COLUMNS
+    }
+    if 'compensation_per_year' in results:
+        summary['compensation_per_year'] = {
+            'years': results['years'].tolist(),
+            'percentiles': percentile_bands(results['compensation_per_year'], percentiles)
+        }
+    return summary
+
+
+def format_text(summary, params):
+    lines = [
+        f"Pension amount in {params['end_year']}: {params['pension_2025']:,.2f} RUB",
+        f"Analysis period: {params['start_year']}-{params['end_year']}",
+        f"Paths: {params['paths']:,} ({params['method']})",
+        ""
+    ]
+    percentiles = list(summary['total_compensation']['percentiles'])
+    lines.append(f"{'':<22}{'mean':>14}" + ''.join(f"{f'p{p:g}':>14}" for p in percentiles))
+    for key, label, digits in (('total_paid', 'Total paid (RUB)', 0),
+                               ('total_compensation', 'Total losses (RUB)', 0),
+                               ('loss_percentage', 'Loss percentage (%)', 2)):
+        values = [summary[key]['mean']] + list(summary[key]['percentiles'].values())
+        lines.append(f"{label:<22}" + ''.join(f"{value:>14,.{digits}f}" for value in values))
+    return '\n'.join(line.replace(',', ' ') for line in lines)
+
+
+def format_json(summary, params):
+    report = dict(params)
+    report.update(summary)
+    return json.dumps(report, indent=2)
+
+
+FORMATTERS = {'json': format_json, 'text': format_text}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo scenarios of inflation lag compensation")
+    parser.add_argument('--pension', type=float, required=True, help="Pension amount in the end year (RUB)")
+    parser.add_argument('--start', type=int, required=True, help="Analysis start year")
+    parser.add_argument('--end', type=int, default=2025, help="Analysis end year")
+    parser.add_argument('--paths', type=int, default=10_000, help="Number of simulated paths")
+    parser.add_argument('--method', choices=['bootstrap', 'normal'], default='bootstrap',
+                        help="Resample historical years or draw from a normal distribution")
+    parser.add_argument('--sample-from', type=int, help="First historical year to resample")
+    parser.add_argument('--sample-to', type=int, help="Last historical year to resample")
+    parser.add_argument('--inflation-mean', type=float, help="Normal method, default: historical mean")
+    parser.add_argument('--inflation-std', type=float, help="Normal method, default: historical value")
+    parser.add_argument('--indexation-mean', type=float, help="Normal method, default: historical mean")
+    parser.add_argument('--indexation-std', type=float, help="Normal method, default: historical value")
+    parser.add_argument('--correlation', type=float, help="Normal method, default: historical value")
+    parser.add_argument('--percentiles', type=lambda s: [float(p) for p in s.split(',')],
+                        default=list(DEFAULT_PERCENTILES), help="Comma-separated, e.g. 5,50,95")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible paths")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes, 0 for all cores")
+    parser.add_argument('--yearly', action='store_true', help="Include yearly percentile bands")
+    parser.add_argument('--data', default=inflation_data.default_data_path(),
+                        help="Excel file with inflation data")
+    parser.add_argument('--format', choices=sorted(FORMATTERS), default='text')
+    parser.add_argument('--output', help="Write per-path totals to a CSV, Parquet or Arrow file")
+    parser.add_argument('--compression', help=exporters.COMPRESSION_HELP)
+    args = parser.parse_args(argv)
+
+    if args.pension <= 0:
+        parser.error("Pension amount must be positive")
+    if args.start > args.end:
+        parser.error("Start year must not be later than end year")
+    if args.paths < 1 or args.chunk_size < 1:
+        parser.error("Number of paths and chunk size must be positive")
+
+    index = inflation_data.load_year_index(args.data)
+    try:
+        if args.method == 'bootstrap':
+            sampler = BootstrapSampler(index, args.sample_from, args.sample_to)
+        else:
+            sampler = NormalSampler.from_history(
+                index,
+                inflation_mean=args.inflation_mean, inflation_std=args.inflation_std,
+                indexation_mean=args.indexation_mean, indexation_std=args.indexation_std,
+                correlation=args.correlation
+            )
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = run_scenarios(sampler, args.paths, args.start, args.end, args.pension, args.seed,
+                            args.chunk_size, args.workers or None, args.yearly)
+    params = {'pension_2025': args.pension, 'start_year': args.start, 'end_year': args.end,
+              'paths': args.paths, 'method': args.method, 'seed': args.seed}
+    sys.stdout.write(FORMATTERS[args.format](summarize(results, args.percentiles), params) + '\n')
+
+    if args.output:
+        columns = {'path': np.arange(args.paths), **{key: results[key] for key in TOTAL_COLUMNS}}
+        exporters.write_columns(args.output, columns, args.compression)
+
+
+if __name__ == "__main__":
+    main()
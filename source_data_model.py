@@ -0,0 +1,100 @@
+"""Editable table model for the inflation data."""
+import math
+
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor
+
+
+class SourceDataModel(QAbstractTableModel):
+    """Years with Rosstat inflation and pension indexation
+
+    Inflation and indexation cells are editable. An accepted edit is
+    reported with valueEdited(year, column, value), where column is
+    'inflation' or 'indexation'; the model itself keeps only its copy
+    of the values.
+    """
+
+    valueEdited = pyqtSignal(int, str, float)
+
+    # (column key, header, decimals)
+    COLUMNS = [
+        ('year', 'Year', 0),
+        ('inflation', 'Rosstat Inflation (%)', 2),
+        ('indexation', 'Pension Indexation (%)', 1)
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [np.empty(0) for _ in self.COLUMNS]
+        self._edited = set()
+        self._edited_color = QColor(255, 244, 214)
+        self._stripe = QColor(245, 245, 245)
+
+    def set_table(self, years, inflation, indexation):
+        """Show a new table; previous edit marks are cleared"""
+        self.beginResetModel()
+        self._columns = [np.array(years), np.array(inflation, dtype=float), np.array(indexation, dtype=float)]
+        self._edited = set()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() > 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        col = index.column()
+        value = self._columns[col][row].item()
+
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return str(value)
+            return f"{value:.{self.COLUMNS[col][2]}f}%"
+        if role == Qt.EditRole:
+            return str(value)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole:
+            if (row, col) in self._edited:
+                return self._edited_color
+            # Alternating row background
+            if row % 2 == 0:
+                return self._stripe
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() == 0:
+            return False
+        try:
+            number = float(str(value).replace(',', '.').rstrip('%').strip())
+        except ValueError:
+            return False
+        # Rates of -100% and below have no growth factor
+        if not math.isfinite(number) or number <= -100.0:
+            return False
+
+        row = index.row()
+        col = index.column()
+        if number == self._columns[col][row]:
+            return False
+        self._columns[col][row] = number
+        self._edited.add((row, col))
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole, Qt.BackgroundRole])
+        self.valueEdited.emit(int(self._columns[0][row]), self.COLUMNS[col][0], number)
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section][1]
+        return super().headerData(section, orientation, role)
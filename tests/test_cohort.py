@@ -0,0 +1,82 @@
+"""Tests of input validation in cohort.py.
+
+Files without a required column are rejected before any calculation, and
+records with missing or invalid values are reported by id instead of
+being calculated from garbage.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import cohort  # noqa: E402
+import compensation_engine  # noqa: E402
+
+YEARS = np.arange(2015, 2026)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return compensation_engine.YearIndex(YEARS, np.full(len(YEARS), 7.0), np.full(len(YEARS), 5.0))
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def process(index, csv_path, **kwargs):
+    return pd.concat(cohort.process_chunks(cohort.read_pensioner_chunks(csv_path), index, **kwargs))
+
+
+def test_valid_records(tmp_path, index):
+    path = write_csv(tmp_path / 'ok.csv', "id,pension_2025,start_year\n1,20000,2020\n2,30000.5,2015\n")
+    result = process(index, path)
+    expected = compensation_engine.calculate_compensation_batch(index, np.array([20000, 30000.5]),
+                                                                np.array([2020, 2015]))
+    np.testing.assert_allclose(result['total_paid'], expected['total_paid'])
+    np.testing.assert_allclose(result['total_compensation'], expected['total_compensation'])
+
+
+@pytest.mark.parametrize('rows, column, ids', [
+    ("1,100,2020\n2,100,\n3,100,2019.5\n4,100,x\n", 'start_year', '2, 3, 4'),
+    ("1,100,2020\n2,,2020\n3,nan,2020\n4,inf,2020\n5,abc,2020\n", 'pension_2025', '2, 3, 4, 5'),
+])
+def test_invalid_values_name_records(tmp_path, index, rows, column, ids):
+    path = write_csv(tmp_path / 'bad.csv', "id,pension_2025,start_year\n" + rows)
+    for events in ((), [(2022, 6, 10.0)]):
+        with pytest.raises(ValueError, match=f"invalid {column} for id {ids}$"):
+            process(index, path, events=events)
+
+
+def test_invalid_start_month(tmp_path, index):
+    path = write_csv(tmp_path / 'bad.csv', "id,pension_2025,start_year,start_month\n1,100,2020,3\n2,100,2020,\n")
+    with pytest.raises(ValueError, match="invalid start_month for id 2$"):
+        process(index, path)
+
+
+def test_many_invalid_records_are_abbreviated(tmp_path, index):
+    rows = ''.join(f"{i},,2020\n" for i in range(25))
+    path = write_csv(tmp_path / 'bad.csv', "id,pension_2025,start_year\n" + rows)
+    with pytest.raises(ValueError, match="for id 0, 1, 2, 3, 4, 5, 6, 7, 8, 9 and 15 more$"):
+        process(index, path)
+
+
+def test_missing_columns(tmp_path):
+    path = write_csv(tmp_path / 'bad.csv', "id,pension\n1,100\n")
+    assert cohort.missing_columns(path) == ['pension_2025', 'start_year']
+
+
+def test_missing_columns_is_usage_error(tmp_path, capsys):
+    path = write_csv(tmp_path / 'bad.csv', "id,start_year\n1,2020\n")
+    # Rejected before the inflation data file is read
+    with pytest.raises(SystemExit) as exit_info:
+        cohort.main([path, str(tmp_path / 'out.csv'), '--data', str(tmp_path / 'no_data.xlsx')])
+    assert exit_info.value.code == 2
+    assert "Missing columns in" in capsys.readouterr().err
+    assert not os.path.exists(tmp_path / 'out.csv')
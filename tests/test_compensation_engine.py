@@ -0,0 +1,127 @@
+"""Regression tests of the closed-form calculation against the original loop.
+
+reference_compensation is the per-year, per-month loop the program used
+before the engine computed series coefficients in closed form; the engine
+must reproduce its totals and yearly summary.
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import compensation_engine  # noqa: E402
+import inflation_data  # noqa: E402
+
+# Default data file of the program, or the bundled one on case-sensitive file systems
+DATA_PATHS = [inflation_data.default_data_path(), os.path.join(REPO_DIR, 'Data', 'russia_inflation.xlsx')]
+PENSION = 25000.0
+RELATIVE_TOLERANCE = 1e-9
+
+
+def reference_compensation(rows, pension_2025, start_year, end_year):
+    """Original calculation: rows maps year -> (inflation, indexation) in percent"""
+    yearly_pensions = {end_year: pension_2025}
+    current_pension = pension_2025
+    for year in range(end_year - 1, start_year - 1, -1):
+        if year + 1 in rows:
+            current_pension = current_pension / (1.0 + rows[year + 1][1] / 100.0)
+        yearly_pensions[year] = current_pension
+
+    yearly_summary = {}
+    total_paid = 0.0
+    total_compensation = 0.0
+    for year in range(start_year, end_year + 1):
+        if year not in rows:
+            continue
+        monthly_inflation = (1.0 + rows[year][0] / 100.0) ** (1.0 / 12.0) - 1.0
+        pension = yearly_pensions[year]
+        year_paid = 0.0
+        year_compensation = 0.0
+        for month in range(1, 13):
+            year_paid += pension
+            year_compensation += pension * (1.0 - 1.0 / (1.0 + monthly_inflation) ** month)
+        total_paid += year_paid
+        total_compensation += year_compensation
+        yearly_summary[year] = {
+            'pension_in_january': pension,
+            'sum_per_year': year_paid,
+            'compensation_per_year': year_compensation,
+            'total_compensation': total_compensation
+        }
+
+    return {
+        'total_paid': total_paid,
+        'total_compensation': total_compensation,
+        'loss_percentage': (total_compensation / total_paid * 100.0) if total_paid > 0 else 0.0,
+        'yearly_summary': yearly_summary
+    }
+
+
+def assert_matches_reference(years, inflation, indexation, start_year, end_year):
+    index = compensation_engine.YearIndex(np.asarray(years), np.asarray(inflation, dtype=float),
+                                          np.asarray(indexation, dtype=float))
+    rows = {int(year): (float(i), float(x)) for year, i, x in zip(years, inflation, indexation)}
+    result = compensation_engine.calculate_compensation(index, PENSION, start_year, end_year)
+    expected = reference_compensation(rows, PENSION, start_year, end_year)
+
+    for key in ('total_paid', 'total_compensation', 'loss_percentage'):
+        assert result[key] == pytest.approx(expected[key], rel=RELATIVE_TOLERANCE, abs=1e-9), key
+    assert sorted(result['yearly_summary']) == sorted(expected['yearly_summary'])
+    for year, summary in expected['yearly_summary'].items():
+        for key, value in summary.items():
+            assert result['yearly_summary'][year][key] == pytest.approx(value, rel=RELATIVE_TOLERANCE, abs=1e-9), \
+                (year, key)
+
+
+@pytest.fixture(scope='module')
+def bundled_table():
+    path = next((path for path in DATA_PATHS if os.path.exists(path)), None)
+    if path is None:
+        pytest.skip("No inflation data file")
+    arrays, _ = inflation_data.load_table_arrays(path)
+    return arrays['year'], arrays['inflation_rosstat'], arrays['indexation']
+
+
+def test_bundled_data_all_windows(bundled_table):
+    years = bundled_table[0].tolist()
+    for start_year in years:
+        for end_year in years:
+            if start_year <= end_year:
+                assert_matches_reference(*bundled_table, start_year, end_year)
+
+
+def test_end_year_equal_to_start_year(bundled_table):
+    year = int(bundled_table[0][len(bundled_table[0]) // 2])
+    assert_matches_reference(*bundled_table, year, year)
+
+
+def test_single_year_table():
+    assert_matches_reference([2025], [9.5], [7.3], 2025, 2025)
+    assert_matches_reference([2025], [9.5], [7.3], 2020, 2025)
+
+
+def test_zero_inflation():
+    years = list(range(2015, 2026))
+    assert_matches_reference(years, [0.0] * len(years), [5.0] * len(years), 2015, 2025)
+    result = compensation_engine.calculate_compensation(
+        compensation_engine.YearIndex(np.array(years), np.zeros(len(years)), np.full(len(years), 5.0)),
+        PENSION, 2015, 2025
+    )
+    assert result['total_compensation'] == 0.0
+
+
+def test_years_missing_from_table():
+    years = [2010, 2011, 2014, 2015, 2018]
+    assert_matches_reference(years, [6.9, 8.8, 11.4, 12.9, 4.3], [6.3, 8.8, 8.3, 11.4, 3.7], 2009, 2019)
+
+
+def test_extreme_inflation():
+    years = [2020, 2021, 2022]
+    assert_matches_reference(years, [-50.0, 1e-10, 1000.0], [0.0, 2.0, 40.0], 2020, 2022)
@@ -0,0 +1,97 @@
+"""Tests of stage profiling when stages overlap.
+
+Only one cProfile profiler can be active at a time (Python 3.12+ raises
+ValueError for a second one; older versions silently stop the first), so
+overlapping stages must neither fail nor cut the running profile short.
+"""
+import json
+import os
+import pstats
+import sys
+import threading
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import instrumentation  # noqa: E402
+
+
+def _work():
+    return sum(i * i for i in range(1000))
+
+
+def _after_inner_stage():
+    return _work()
+
+
+def profiled_instrumentation(tmp_path):
+    return instrumentation.Instrumentation(profile_calls=True, log_path=str(tmp_path / 'log.jsonl'))
+
+
+def profiled_functions(record):
+    stats = pstats.Stats(record['profile']['file'])
+    return {function for _, _, function in stats.stats}
+
+
+def test_nested_stages(tmp_path):
+    records = []
+    instr = profiled_instrumentation(tmp_path)
+    instr.listeners.append(records.append)
+
+    action = instr.action('nested')
+    with action.stage('outer'):
+        with action.stage('inner'):
+            _work()
+        _after_inner_stage()
+    action.finish()
+
+    record = records[0]
+    assert record['status'] == 'ok'
+    assert set(record['stages_ms']) == {'outer', 'inner'}
+    assert record['profile']['unprofiled_stages'] == ['inner']
+    # The outer profile keeps running after the inner stage
+    assert '_after_inner_stage' in profiled_functions(record)
+    with open(tmp_path / 'log.jsonl', encoding='utf-8') as f:
+        assert json.loads(f.readline())['action'] == 'nested'
+
+
+def test_stages_overlapping_across_threads(tmp_path):
+    records = []
+    instr = profiled_instrumentation(tmp_path)
+    instr.listeners.append(records.append)
+    worker_started = threading.Event()
+    main_done = threading.Event()
+    errors = []
+
+    def worker(action):
+        try:
+            with action.stage('compute'):
+                worker_started.set()
+                main_done.wait(5)
+                _work()
+        except Exception as e:
+            errors.append(e)
+        action.finish()
+
+    calculation = instr.action('calculate')
+    thread = threading.Thread(target=worker, args=(calculation,))
+    with instr.measure('edit_data') as action:
+        with action.stage('results'):
+            thread.start()
+            worker_started.wait(5)
+            _work()
+        main_done.set()
+    thread.join(5)
+
+    assert not errors
+    assert {record['action'] for record in records} == {'edit_data', 'calculate'}
+    for record in records:
+        assert record['status'] == 'ok'
+        assert len(record['stages_ms']) == 1
+
+    # Profiling works again once the stages are over
+    action = instr.action('later')
+    with action.stage('stage'):
+        _work()
+    action.finish()
+    assert '_work' in profiled_functions(records[-1])
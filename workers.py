@@ -0,0 +1,55 @@
+"""Background tasks for long-running calculations and exports."""
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when the user cancelled it"""
+
+
+class TaskSignals(QObject):
+    """Signals of a background task, delivered to the GUI thread"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str, str)
+    cancelled = pyqtSignal()
+
+
+class Task(QRunnable):
+    """Run fn(task, *args) on a thread pool
+
+    fn reports progress with task.report_progress(percent), which raises
+    TaskCancelled once cancel() has been called. The return value of fn is
+    delivered through signals.finished.
+    """
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def report_progress(self, percent):
+        if self._cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(int(percent))
+
+    def run(self):
+        try:
+            result = self.fn(self, *self.args)
+            if self._cancelled:
+                raise TaskCancelled()
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e), traceback.format_exc())
+        else:
+            self.signals.finished.emit(result)